@@ -0,0 +1,77 @@
+"""Geodesic helpers for splitting long routes into segments and stitching them back.
+
+Shared by scripts/run_poc_segmented.py and the long-route integration tests. Everything
+works on (lat, lon) pairs in degrees and is vectorized with NumPy, so whole polylines
+are handled in one pass.
+"""
+from typing import List, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_M = 6371000.0
+
+
+def haversine_many(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Element-wise great-circle distances in meters between coordinate arrays in degrees.
+
+    The one haversine implementation; haversine_m and app.routing wrap it.
+    """
+    lat1 = np.radians(lat1)
+    lat2 = np.radians(lat2)
+    dlon = np.radians(np.subtract(lon2, lon1))
+    h = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(h, 1.0)))
+
+
+def haversine_m(a, b):
+    """Great-circle distance in meters between (lat, lon) points.
+
+    a and b may also be (n, 2) arrays (or broadcast against each other); then all
+    distances come from one NumPy pass and an array is returned.
+    """
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    d = haversine_many(a[..., 0], a[..., 1], b[..., 0], b[..., 1])
+    return float(d) if d.ndim == 0 else d
+
+
+def haversine_km(a, b):
+    """haversine_m in kilometers."""
+    return haversine_m(a, b) / 1000.0
+
+
+def interp_points(a: Tuple[float, float], b: Tuple[float, float], n: int) -> List[Tuple[float, float]]:
+    """Return n+1 points from a to b, evenly spaced along the great circle.
+
+    Linear steps in lat/lon drift off the geodesic on long, diagonal routes, which
+    pushes segment endpoints away from the road corridor; slerp between the unit
+    vectors of a and b keeps every point on the shortest path.
+    """
+    lat = np.radians([a[0], b[0]])
+    lon = np.radians([a[1], b[1]])
+    v = np.column_stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)))
+    omega = np.arccos(np.clip(v[0] @ v[1], -1.0, 1.0))
+    t = np.linspace(0.0, 1.0, n + 1)[:, None]
+    if omega < 1e-12:
+        p = np.repeat(v[:1], n + 1, axis=0)
+    else:
+        p = (np.sin((1 - t) * omega) * v[0] + np.sin(t * omega) * v[1]) / np.sin(omega)
+    lats = np.degrees(np.arcsin(np.clip(p[:, 2], -1.0, 1.0)))
+    lons = np.degrees(np.arctan2(p[:, 1], p[:, 0]))
+    # exact endpoints, free of trigonometric round-off
+    lats[0], lons[0], lats[-1], lons[-1] = a[0], a[1], b[0], b[1]
+    return list(zip(lats.tolist(), lons.tolist()))
+
+
+def stitch_coords(all_coords: List[List[Tuple[float, float]]]) -> List[Tuple[float, float]]:
+    """Concatenate segment polylines, dropping consecutive duplicate points.
+
+    Segments usually start where the previous one ended, so the shared point is kept once.
+    """
+    chunks = [np.asarray(seg, dtype=np.float64).reshape(-1, 2) for seg in all_coords if len(seg)]
+    if not chunks:
+        return []
+    arr = np.concatenate(chunks)
+    keep = np.ones(len(arr), dtype=bool)
+    keep[1:] = np.any(arr[1:] != arr[:-1], axis=1)
+    return list(zip(arr[keep, 0].tolist(), arr[keep, 1].tolist()))
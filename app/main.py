@@ -1,10 +1,12 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from pydantic import BaseModel, Field
-from typing import Optional, Tuple
+from fastapi.responses import Response
+from pydantic import BaseModel, ConfigDict, Field
+from typing import List, Optional, Tuple
 from app.routing import compute_route
+import asyncio
+import hashlib
 import os
 
 app = FastAPI(title="Jadlo Route Planner PoC")
@@ -14,7 +16,9 @@ app = FastAPI(title="Jadlo Route Planner PoC")
 allowed_origins = os.getenv("ALLOWED_ORIGINS", "*").split(",")
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=allowed_origins if allowed_origins != ["*"] else ["*"],  # In production, set ALLOWED_ORIGINS env var
+    # In production, set ALLOWED_ORIGINS env var. Starlette checks `origin in allow_origins`
+    # on every request, so a frozenset turns that into one hash lookup instead of a list scan.
+    allow_origins=frozenset(o.strip() for o in allowed_origins),
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
@@ -25,7 +29,36 @@ static_path = os.path.join(os.path.dirname(__file__), "..", "static")
 if os.path.exists(static_path):
     app.mount("/static", StaticFiles(directory=static_path), name="static")
 
+# The web interface is served on every `/` hit, so read it once at startup instead of
+# stat()-ing and opening the file per request. Restart the app to pick up a new index.html.
+index_path = os.path.join(static_path, "index.html")
+_INDEX_BYTES: Optional[bytes] = None
+_INDEX_ETAG: Optional[str] = None
+if os.path.exists(index_path):
+    with open(index_path, "rb") as f:
+        _INDEX_BYTES = f.read()
+    _INDEX_ETAG = '"%s"' % hashlib.blake2b(_INDEX_BYTES, digest_size=16).hexdigest()
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches ``etag``.
+
+    The header may list several tags or be ``*``; tags compare weakly, so a ``W/``
+    prefix (added e.g. by compressing proxies) is ignored.
+    """
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
 class RouteParams(BaseModel):
+    # Immutable, so the shared default instance on RouteRequest can be reused safely
+    model_config = ConfigDict(frozen=True)
+
     prefer_main_roads: float = Field(0.5, ge=0.0, le=1.0, description="0 = avoid main roads, 1 = prefer main roads")
     prefer_unpaved: float = Field(0.5, ge=0.0, le=1.0, description="0 = avoid unpaved, 1 = prefer unpaved")
     heatmap_influence: float = Field(0.0, ge=0.0, le=1.0, description="0 = ignore heatmaps, 1 = follow heatmap strongly (mocked)")
@@ -37,13 +70,22 @@ class RouteRequest(BaseModel):
     end: Tuple[float, float] = Field(..., description="(lat, lon)")
     params: Optional[RouteParams] = RouteParams()
 
+class RouteResponse(BaseModel):
+    coords: List[Tuple[float, float]] = Field(..., description="Route geometry as (lat, lon) pairs")
+    gpx: str = Field(..., description="Route as a GPX 1.1 document")
 
-@app.post('/route')
+
+@app.post('/route', response_model=RouteResponse)
 async def route(req: RouteRequest):
     """Compute route between start and end using PoC weighting logic.
     Returns: geo coordinates and GPX string.
+
+    Routing is blocking (Overpass download + graph search), so it runs in a worker
+    thread to keep the event loop free for concurrent requests. The response model lets
+    FastAPI serialize the (potentially long) coordinate list straight to JSON bytes
+    in pydantic-core instead of going through jsonable_encoder + json.dumps.
     """
-    coords, gpx = compute_route(req.start, req.end, req.params.dict())
+    coords, gpx = await asyncio.to_thread(compute_route, req.start, req.end, req.params.model_dump())
     return {"coords": coords, "gpx": gpx}
 
 
@@ -54,9 +96,11 @@ async def health():
 
 
 @app.get('/')
-async def index():
+async def index(request: Request):
     """Serve the web interface if it exists, otherwise return API info."""
-    index_path = os.path.join(os.path.dirname(__file__), "..", "static", "index.html")
-    if os.path.exists(index_path):
-        return FileResponse(index_path)
+    if _INDEX_BYTES is not None:
+        headers = {"ETag": _INDEX_ETAG}
+        if _etag_matches(request.headers.get("if-none-match"), _INDEX_ETAG):
+            return Response(status_code=304, headers=headers)
+        return Response(_INDEX_BYTES, media_type="text/html", headers=headers)
     return {"msg": "Jadlo Route Planner PoC - use POST /route or visit the web interface"}
@@ -1,8 +1,8 @@
 """
 Routing module for Jadlo route planner.
 
-This module implements route calculation using Dijkstra's algorithm (via NetworkX's shortest_path)
-and A* algorithm (for intersection-based routing). Routes are calculated based on customizable
+This module implements route calculation using Dijkstra's algorithm (via SciPy's compiled csgraph
+routines on a CSR adjacency built from the OSMnx graph) and A* algorithm (for intersection-based routing). Routes are calculated based on customizable
 edge weights that consider:
 - Road surface type (primary factor for route quality)
 - Highway classification
@@ -19,19 +19,62 @@ The route value calculation emphasizes surface type as requested, allowing users
 - Control the weight/importance of surface in route selection via surface_weight_factor
 - Balance between shortest distance and preferred surface quality
 """
+import functools
+import hashlib
+import importlib.metadata
+import io
+import itertools
 import os
-from typing import Tuple, List, Dict, Any
-import gpxpy
-import gpxpy.gpx
-import osmnx as ox
+import pickle
+import threading
+import weakref
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from math import radians, degrees, sin, cos, atan2, ceil, floor, inf
+from typing import Tuple, List, Dict, Any, NamedTuple
+import numpy as np
 import networkx as nx
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+from scipy.spatial import cKDTree
 import logging
 import time
+from app.geoutils import haversine_m, haversine_many
 
-ox.config(use_cache=True, log_console=True)
+try:
+    import zstandard
+except ImportError:  # optional: graph cache files are then written uncompressed
+    zstandard = None
 
 logger = logging.getLogger(__name__)
 
+# OSMnx writes its own progress log straight to the console; off unless asked for, since
+# the timing of each routing phase is already logged through `logger`.
+OSMNX_LOG_CONSOLE = os.getenv('JADLO_OSMNX_LOG_CONSOLE', '0') == '1'
+
+
+def _osmnx():
+    """Import and configure OSMnx on first use and return the module.
+
+    OSMnx pulls in geopandas, shapely and matplotlib, which makes it the bulk of this
+    module's import time. It is only needed to download graphs, so importing it lazily
+    keeps app startup fast and lets workers serving from the graph cache skip it. The
+    module is also reachable as ``app.routing.ox``.
+    """
+    ox = globals().get('ox')
+    if ox is None:
+        import osmnx as ox
+        ox.settings.use_cache = True
+        ox.settings.log_console = OSMNX_LOG_CONSOLE
+        globals()['ox'] = ox
+    return ox
+
+
+def __getattr__(name):
+    if name == 'ox':
+        return _osmnx()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
 # Mapping examples for penalties/bonuses. These are simple and intended for PoC only.
 HIGHWAY_PENALTIES = {
     'motorway': 5.0,
@@ -56,12 +99,19 @@ SURFACE_PENALTIES = {
     'dirt': 2.0,
 }
 
+# Tags affected by the prefer_main_roads / prefer_unpaved preferences
+MAIN_ROAD_HIGHWAYS = frozenset({'primary', 'secondary', 'trunk', 'motorway'})
+UNPAVED_SURFACES = frozenset({'gravel', 'unpaved', 'dirt'})
+
 
+@functools.lru_cache(maxsize=512)
 def _get_surface_penalty(surface: str) -> float:
     """Get base surface penalty for a given surface type.
     
     Handles compound surface types (e.g., 'asphalt:lanes') by checking the prefix.
     Returns 1.0 (neutral) for unknown surface types.
+    Results are cached: OSM uses only a few dozen distinct surface values, so the
+    prefix split runs once per value rather than once per edge.
     
     Args:
         surface: Surface type string from OSM data
@@ -85,6 +135,16 @@ def _get_surface_penalty(surface: str) -> float:
     return 1.0
 
 
+@functools.lru_cache(maxsize=1024)
+def _surface_factor(surface: str, surface_weight_factor: float) -> float:
+    """Surface penalty scaled by surface_weight_factor (base_sp ** factor), cached.
+
+    A routing request uses a single surface_weight_factor, so this turns the per-edge
+    power into a lookup.
+    """
+    return _get_surface_penalty(surface) ** surface_weight_factor
+
+
 def _edge_penalty(u, v, key, data, params: Dict[str, Any]) -> float:
     """Calculate edge weight/penalty based on route preferences.
     
@@ -107,51 +167,70 @@ def _edge_penalty(u, v, key, data, params: Dict[str, Any]) -> float:
     """
     # base: length in meters
     length = data.get('length', 1.0)
-
-    # highway penalty
     highway = data.get('highway')
     if isinstance(highway, list):
         highway = highway[0]
-    hp = HIGHWAY_PENALTIES.get(highway, 1.0)
-
-    # Surface penalty - this is the primary factor for route value by surface
-    # The surface_weight_factor parameter controls how strongly surface influences the route
     surface = data.get('surface')
-    sp = 1.0
-    if surface:
-        base_sp = _get_surface_penalty(surface)
-        # Apply surface_weight_factor: higher factor = surface matters more in route choice
-        surface_weight_factor = params.get('surface_weight_factor', 1.0)
-        # Convert penalty from base using exponential scaling for stronger effect
-        # sp = base_sp ^ surface_weight_factor gives stronger differentiation
-        sp = base_sp ** surface_weight_factor
+    if isinstance(surface, list):
+        surface = surface[0]
+    return _compile_penalty(*_penalty_key(params))(length, highway, surface)
 
+
+# Preferences that affect edge weights, with their defaults, in _compile_penalty's order
+_PENALTY_DEFAULTS = {
+    'prefer_main_roads': 0.5,
+    'prefer_unpaved': 0.5,
+    'heatmap_influence': 0.0,
+    'surface_weight_factor': 1.0,
+}
+
+
+def _penalty_key(params: Dict[str, Any]) -> Tuple[float, float, float, float]:
+    """Extract the preferences that affect edge weights as a hashable tuple."""
+    return tuple(float(params.get(name, default)) for name, default in _PENALTY_DEFAULTS.items())
+
+
+@functools.lru_cache(maxsize=64)
+def _compile_penalty(prefer_main: float, prefer_unpaved: float, heatmap_influence: float, surface_weight_factor: float):
+    """Return ``penalty(length, highway, surface) -> weight`` specialized for one set of preferences.
+
+    The preference-dependent factors are constant for a whole routing request, so they
+    are computed once here and closed over; the returned function only does the
+    per-edge tag lookups. Cached, since most requests use a handful of presets.
+    """
     # prefer_main_roads: if user prefers main roads, we reduce penalty for main roads
-    prefer_main = params.get('prefer_main_roads', 0.5)
     avoid_factor = 1.5
     prefer_factor = 0.7
-    if highway in ('primary', 'secondary', 'trunk', 'motorway'):
-        hp = hp * (avoid_factor + (prefer_factor - avoid_factor) * prefer_main)
+    main_factor = avoid_factor + (prefer_factor - avoid_factor) * prefer_main
 
-    # prefer_unpaved: if user prefers unpaved, decrease penalty for gravel/unpaved
-    prefer_unpaved = params.get('prefer_unpaved', 0.5)
-    if surface in ('gravel', 'unpaved', 'dirt'):
-        # Additional adjustment beyond base surface penalty for user who explicitly prefers unpaved
-        sp = sp * (1.0 - 0.5 * (prefer_unpaved - 0.5))
+    # prefer_unpaved: additional adjustment beyond base surface penalty for gravel/unpaved
+    unpaved_factor = 1.0 - 0.5 * (prefer_unpaved - 0.5)
 
     # heatmap influence: PoC - we don't have heatmap data, so we mock by looking for 'cycleway' tag
-    heatmap_influence = params.get('heatmap_influence', 0.0)
-    heatmap_bonus = 1.0
-    if heatmap_influence > 0 and highway == 'cycleway':
-        heatmap_bonus = 1.0 - 0.4 * heatmap_influence
+    cycleway_bonus = 1.0 - 0.4 * heatmap_influence if heatmap_influence > 0 else 1.0
 
     # streetview preference: PoC - not implemented, neutral
-    streetview_pref = params.get('prefer_streetview', 0.0)
 
-    # Final weight calculation: combines all factors
-    # This weight is used by Dijkstra's algorithm to find the optimal route
-    weight = length * hp * sp * heatmap_bonus
-    return weight
+    def penalty(length: float, highway: str | None, surface: str | None) -> float:
+        hp = HIGHWAY_PENALTIES.get(highway, 1.0)
+        if highway in MAIN_ROAD_HIGHWAYS:
+            hp *= main_factor
+        elif highway == 'cycleway':
+            hp *= cycleway_bonus
+
+        # Surface penalty - the primary factor for route value by surface. With
+        # sp = base_sp ^ surface_weight_factor, a higher factor = surface matters more
+        sp = 1.0
+        if surface:
+            sp = _surface_factor(surface, surface_weight_factor)
+            if surface in UNPAVED_SURFACES:
+                sp *= unpaved_factor
+
+        # Final weight calculation: combines all factors
+        # This weight is used by Dijkstra's algorithm to find the optimal route
+        return length * hp * sp
+
+    return penalty
 
 
 def calculate_edge_weight(length: float, highway: str, surface: str | None, params: Dict[str, Any]) -> float:
@@ -189,26 +268,307 @@ def calculate_edge_weight(length: float, highway: str, surface: str | None, para
     return _edge_penalty(None, None, None, edge_data, params)
 
 
+class _EdgeColumns(NamedTuple):
+    """Per-edge attributes in ``G.edges(keys=True)`` order, with dictionary-encoded tags.
+
+    ``highway_codes[i]`` indexes ``highway_values`` (and likewise for surface), so
+    tag-dependent factors are looked up once per distinct value and gathered per edge.
+    """
+    length: np.ndarray
+    highway_values: List[str]
+    highway_codes: np.ndarray
+    surface_values: List[str]
+    surface_codes: np.ndarray
+
+
+def _edge_columns(G: nx.MultiDiGraph) -> _EdgeColumns:
+    """Extract length, highway and surface of every edge as NumPy columns.
+
+    Columns follow ``G.edges(keys=True)`` order. List-valued tags (produced by OSMnx when
+    merging ways) are reduced to their first entry and missing tags become ''. Tags are
+    encoded to integer codes while reading, so no string arrays are built or sorted.
+    The attributes are static per graph, so the columns are cached on ``G.graph`` and
+    only the preference-dependent weights are recomputed per request.
+    """
+    cols = G.graph.get('_jadlo_edge_columns')
+    if cols is None:
+        cols = _read_edge_columns(G)
+        G.graph['_jadlo_edge_columns'] = cols
+    return cols
+
+
+def _read_edge_columns(G: nx.MultiDiGraph) -> _EdgeColumns:
+    """Walk G's edge dicts once and build the _EdgeColumns (uncached, see _edge_columns)."""
+    lengths = []
+    highway_index: Dict[str, int] = {}
+    surface_index: Dict[str, int] = {}
+    highway_codes = []
+    surface_codes = []
+    for _, _, data in G.edges(data=True):
+        lengths.append(data.get('length', 1.0))
+        highway = data.get('highway')
+        if type(highway) is list:
+            highway = highway[0]
+        surface = data.get('surface')
+        if type(surface) is list:
+            surface = surface[0]
+        highway_codes.append(highway_index.setdefault(highway or '', len(highway_index)))
+        surface_codes.append(surface_index.setdefault(surface or '', len(surface_index)))
+    return _EdgeColumns(
+        np.asarray(lengths, dtype=np.float64),
+        list(highway_index),
+        np.asarray(highway_codes, dtype=np.intp),
+        list(surface_index),
+        np.asarray(surface_codes, dtype=np.intp),
+    )
+
+
+def _edge_weights(cols: _EdgeColumns, params: Dict[str, Any]) -> np.ndarray:
+    """Vectorized equivalent of _edge_penalty over whole edge columns.
+
+    Tag lookups and preference adjustments are done once per distinct highway/surface
+    value (OSM uses a few dozen) and gathered per edge through the tag codes, so the
+    per-edge work is a few gathers and multiplies with no per-edge branching.
+    """
+    hw_values = np.array(cols.highway_values, dtype=str)
+    sf_values = np.array(cols.surface_values, dtype=str)
+
+    surface_weight_factor = params.get('surface_weight_factor', 1.0)
+    hp = np.array([HIGHWAY_PENALTIES.get(h, 1.0) for h in cols.highway_values], dtype=np.float64)
+    sp = np.array([_surface_factor(s, surface_weight_factor) if s else 1.0 for s in cols.surface_values], dtype=np.float64)
+
+    prefer_main = params.get('prefer_main_roads', 0.5)
+    avoid_factor = 1.5
+    prefer_factor = 0.7
+    is_main = np.isin(hw_values, tuple(MAIN_ROAD_HIGHWAYS))
+    hp = np.where(is_main, hp * (avoid_factor + (prefer_factor - avoid_factor) * prefer_main), hp)
+
+    prefer_unpaved = params.get('prefer_unpaved', 0.5)
+    is_unpaved = np.isin(sf_values, tuple(UNPAVED_SURFACES))
+    sp = np.where(is_unpaved, sp * (1.0 - 0.5 * (prefer_unpaved - 0.5)), sp)
+
+    heatmap_influence = params.get('heatmap_influence', 0.0)
+    if heatmap_influence > 0:
+        hp = np.where(hw_values == 'cycleway', hp * (1.0 - 0.4 * heatmap_influence), hp)
+
+    # one output array, multiplied in place: no edge-sized temporaries beyond the gathers
+    weights = np.take(hp, cols.highway_codes)
+    weights *= np.take(sp, cols.surface_codes)
+    weights *= cols.length
+    return weights
+
+
+def _edge_positions(G: nx.MultiDiGraph) -> Dict[Tuple[Any, Any, Any], int]:
+    """Map each edge key (u, v, k) to its position in ``G.edges(keys=True)`` order.
+
+    Edge weights are kept in arrays aligned with that order (see _edge_weights) so that
+    shared, cached graphs are never mutated per request; this index lets code that walks
+    G edge-by-edge find an edge's weight. Cached on ``G.graph``.
+    """
+    pos = G.graph.get('_jadlo_edge_pos')
+    if pos is None:
+        pos = {edge: i for i, edge in enumerate(G.edges(keys=True))}
+        G.graph['_jadlo_edge_pos'] = pos
+    return pos
+
+
+def _node_coords(G: nx.MultiDiGraph) -> Tuple[Dict[Any, int], np.ndarray, np.ndarray]:
+    """Return ``(node_idx, node_y, node_x)``: node coordinates as two float64 arrays.
+
+    ``node_idx`` maps a node id to its position in ``G.nodes`` order. Nodes without
+    coordinates (neither 'y'/'x' nor 'lat'/'lon') get NaN. Built once per graph and
+    cached on ``G.graph``, so the simplification, reconstruction and length fallback
+    share one copy instead of each building a dict of tuples.
+    """
+    arrays = G.graph.get('_jadlo_node_coords')
+    if arrays is None:
+        node_idx: Dict[Any, int] = {}
+        ys: List[Any] = []
+        xs: List[Any] = []
+        for i, (n, d) in enumerate(G.nodes(data=True)):
+            node_idx[n] = i
+            y = d.get('y')
+            x = d.get('x')
+            ys.append(d.get('lat') if y is None else y)
+            xs.append(d.get('lon', d.get('lon_deg')) if x is None else x)
+        arrays = (node_idx, np.array(ys, dtype=np.float64), np.array(xs, dtype=np.float64))
+        G.graph['_jadlo_node_coords'] = arrays
+    return arrays
+
+
+def _edge_endpoints(G: nx.MultiDiGraph) -> Tuple[List, Dict[Any, int], np.ndarray, np.ndarray]:
+    """Return ``(nodes, node_idx, edge_u, edge_v)``: G's topology as integer arrays.
+
+    ``nodes`` lists node ids in ``G.nodes`` order, ``node_idx`` maps them back, and
+    ``edge_u``/``edge_v`` hold the endpoint indices of every edge in
+    ``G.edges(keys=True)`` order, i.e. aligned with the weight arrays. Built once per
+    graph and cached on ``G.graph``, so routing on a cached graph skips the Python pass
+    over all edges.
+    """
+    arrays = G.graph.get('_jadlo_edge_endpoints')
+    if arrays is None:
+        node_idx, _, _ = _node_coords(G)
+        uv = np.array([(node_idx[u], node_idx[v]) for u, v in G.edges()], dtype=np.int64).reshape(-1, 2)
+        arrays = (list(G.nodes), node_idx, uv[:, 0].copy(), uv[:, 1].copy())
+        G.graph['_jadlo_edge_endpoints'] = arrays
+    return arrays
+
+
+def _csr_topology(G: nx.MultiDiGraph) -> Dict[str, np.ndarray]:
+    """Return the weight-independent part of G's CSR adjacency and of its transpose.
+
+    Edges are sorted by (u, v) once; ``order`` gathers per-edge weights into that order
+    and ``starts`` marks where each group of parallel edges begins, so a request only
+    needs ``np.minimum.reduceat(weights[order], starts)`` to get one weight per distinct
+    (src, dst) pair. ``indptr`` plus ``dst`` form the forward CSR, and ``t_perm``,
+    ``t_indices`` and ``t_indptr`` the transposed one used by the backward search.
+    Cached on ``G.graph``.
+    """
+    topo = G.graph.get('_jadlo_csr_topology')
+    if topo is None:
+        nodes, _, edge_u, edge_v = _edge_endpoints(G)
+        n_nodes = len(nodes)
+        order = np.lexsort((edge_v, edge_u))
+        su = edge_u[order]
+        sv = edge_v[order]
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = (su[1:] != su[:-1]) | (sv[1:] != sv[:-1])
+        starts = np.flatnonzero(first)
+        src = su[starts]
+        dst = sv[starts]
+        indptr = np.zeros(n_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=n_nodes), out=indptr[1:])
+        t_perm = np.lexsort((src, dst))
+        t_indptr = np.zeros(n_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(dst, minlength=n_nodes), out=t_indptr[1:])
+        topo = {
+            'order': order,
+            'starts': starts,
+            'src': src,
+            'dst': dst,
+            'indptr': indptr,
+            't_perm': t_perm,
+            't_indices': src[t_perm],
+            't_indptr': t_indptr,
+        }
+        G.graph['_jadlo_csr_topology'] = topo
+    return topo
+
+
+def _nearest_nodes(G: nx.MultiDiGraph, points: List[Tuple[float, float]]) -> List:
+    """Return the graph node nearest to each (lat, lon) point, by great-circle distance.
+
+    Nodes are placed on the unit sphere, where the chord distance is monotonic in the
+    great-circle distance, and indexed with a cKDTree that is built once per graph and
+    cached on ``G.graph``; all points are answered with one batched query. Replaces
+    ``ox.distance.nearest_nodes``, which rebuilds its tree on every call (and needs
+    scikit-learn for unprojected graphs). Nodes without coordinates are never returned.
+    """
+    cached = G.graph.get('_jadlo_node_tree')
+    if cached is None:
+        _, node_y, node_x = _node_coords(G)
+        valid = np.flatnonzero(np.isfinite(node_y) & np.isfinite(node_x))
+        cached = (cKDTree(_unit_vectors(node_y[valid], node_x[valid])), valid, list(G.nodes))
+        G.graph['_jadlo_node_tree'] = cached
+    tree, valid, nodes = cached
+    lat, lon = np.asarray(points, dtype=np.float64).reshape(-1, 2).T
+    _, idx = tree.query(_unit_vectors(lat, lon))
+    return [nodes[i] for i in valid[idx].tolist()]
+
+
+def _unit_vectors(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    """Convert degree coordinates to an (n, 3) array of points on the unit sphere."""
+    phi = np.radians(lat)
+    lam = np.radians(lon)
+    cos_phi = np.cos(phi)
+    return np.column_stack((cos_phi * np.cos(lam), cos_phi * np.sin(lam), np.sin(phi)))
+
+
+def _shortest_path_csr(G: nx.MultiDiGraph, weights: np.ndarray, orig, dest) -> List:
+    """Return the shortest path from orig to dest as a list of node ids (see _shortest_path_idx)."""
+    nodes = _edge_endpoints(G)[0]
+    return [nodes[i] for i in _shortest_path_idx(G, weights, orig, dest).tolist()]
+
+
+def _shortest_path_idx(G: nx.MultiDiGraph, weights: np.ndarray, orig, dest) -> np.ndarray:
+    """Bidirectional Dijkstra from orig to dest using SciPy's compiled csgraph routine.
+
+    ``weights`` holds one weight per edge in ``G.edges(keys=True)`` order. They are
+    gathered into the graph's cached CSR layout (see _csr_topology); of several
+    parallel edges only the cheapest is kept, matching NetworkX's multigraph semantics.
+
+    Forward (from orig) and backward (from dest, on the transposed matrix) searches are
+    both capped at a distance ``limit``. If a path costs at most 2 * limit, it has an
+    edge (a, b) with a settled forward and b settled backward, so the cheapest
+    ``dist_f[a] + w(a, b) + dist_b[b]`` is the exact shortest path. The limit starts at
+    half the straight-line distance and doubles until that holds, so only two discs of
+    about half the route length are explored rather than the whole fetched area.
+    Returns the path as node indices into ``G.nodes`` order (the index used by
+    _node_coords), or raises nx.NetworkXNoPath.
+    """
+    nodes, node_idx, _, _ = _edge_endpoints(G)
+    topo = _csr_topology(G)
+    src = topo['src']
+    dst = topo['dst']
+    # cheapest weight of each parallel group
+    wgt = np.asarray(weights, dtype=np.float64)[topo['order']]
+    if len(wgt):
+        wgt = np.minimum.reduceat(wgt, topo['starts'])
+    shape = (len(nodes), len(nodes))
+    adj = csr_matrix((wgt, dst, topo['indptr']), shape=shape)
+    adj_t = csr_matrix((wgt[topo['t_perm']], topo['t_indices'], topo['t_indptr']), shape=shape)
+
+    i_orig = node_idx[orig]
+    i_dest = node_idx[dest]
+    if i_orig == i_dest:
+        return np.array([i_orig], dtype=np.int64)
+
+    _, node_y, node_x = _node_coords(G)
+    limit = 0.5 * float(_haversine_many(node_y[i_orig], node_x[i_orig], node_y[i_dest], node_x[i_dest]))
+    total = float(wgt.sum())
+    if not np.isfinite(limit) or limit <= 0.0 or limit >= total:
+        limit = np.inf
+    while True:
+        dist_f, pred_f = dijkstra(adj, directed=True, indices=i_orig, limit=limit, return_predecessors=True)
+        dist_b, pred_b = dijkstra(adj_t, directed=True, indices=i_dest, limit=limit, return_predecessors=True)
+        via = dist_f[src] + wgt + dist_b[dst]
+        k = int(np.argmin(via)) if len(via) else -1
+        best = min(dist_f[i_dest], via[k] if k >= 0 else np.inf)
+        if not np.isfinite(best) and limit == np.inf:
+            raise nx.NetworkXNoPath(f'No path between {orig} and {dest}.')
+        if best <= 2 * limit:
+            break
+        limit = np.inf if 4 * limit >= total else 2 * limit
+
+    if dist_f[i_dest] <= best:
+        meet_f, meet_b = i_dest, None
+    else:
+        meet_f, meet_b = int(src[k]), int(dst[k])
+
+    path_idx = [meet_f]
+    while path_idx[-1] != i_orig:
+        path_idx.append(pred_f[path_idx[-1]])
+    path_idx.reverse()
+    if meet_b is not None:
+        # backward predecessors point one step closer to dest
+        path_idx.append(meet_b)
+        while path_idx[-1] != i_dest:
+            path_idx.append(pred_b[path_idx[-1]])
+    return np.array(path_idx, dtype=np.int64)
+
+
 def _haversine(a: Tuple[float, float], b: Tuple[float, float]) -> float:
     """Return great-circle distance in meters between two (lat, lon) points."""
-    from math import radians, sin, cos, atan2, sqrt
+    return haversine_m(a, b)
 
-    lat1, lon1 = a
-    lat2, lon2 = b
-    R = 6371000.0
-    phi1 = radians(lat1)
-    phi2 = radians(lat2)
-    dphi = radians(lat2 - lat1)
-    dlambda = radians(lon2 - lon1)
-    a_ = sin(dphi / 2) ** 2 + cos(phi1) * cos(phi2) * sin(dlambda / 2) ** 2
-    c = 2 * atan2(sqrt(a_), sqrt(1 - a_))
-    return R * c
+
+def _haversine_many(lat1: np.ndarray, lon1: np.ndarray, lat2: np.ndarray, lon2: np.ndarray) -> np.ndarray:
+    """Vectorized _haversine: element-wise great-circle distances in meters between coordinate arrays."""
+    return haversine_many(lat1, lon1, lat2, lon2)
 
 
 def _bearing(a: Tuple[float, float], b: Tuple[float, float]) -> float:
     """Return bearing in degrees from point a to b (lat, lon)."""
-    from math import radians, degrees, atan2, sin, cos
-
     lat1, lon1 = map(radians, a)
     lat2, lon2 = map(radians, b)
     dlon = lon2 - lon1
@@ -217,86 +577,130 @@ def _bearing(a: Tuple[float, float], b: Tuple[float, float]) -> float:
     return (degrees(atan2(x, y)) + 360) % 360
 
 
+def _bearing_many(lat1: np.ndarray, lon1: np.ndarray, lat2: np.ndarray, lon2: np.ndarray) -> np.ndarray:
+    """Vectorized _bearing: element-wise bearing in degrees from (lat1, lon1) to (lat2, lon2)."""
+    phi1 = np.radians(lat1)
+    phi2 = np.radians(lat2)
+    dlon = np.radians(np.subtract(lon2, lon1))
+    x = np.sin(dlon) * np.cos(phi2)
+    y = np.cos(phi1) * np.sin(phi2) - np.sin(phi1) * np.cos(phi2) * np.cos(dlon)
+    return (np.degrees(np.arctan2(x, y)) + 360) % 360
+
+
+@functools.cache
+def _ox_add_edge_lengths():
+    """OSMnx's edge-length helper, probed once: its location differs between OSMnx versions."""
+    ox = _osmnx()
+    return getattr(ox, 'add_edge_lengths', None) or getattr(ox.utils_graph, 'add_edge_lengths', None)
+
+
 def _ensure_edge_lengths(G: nx.MultiDiGraph) -> nx.MultiDiGraph:
     """Ensure every edge in G has a 'length' attribute.
 
-    Try several osmnx helper entrypoints across versions. If none are available
-    compute an approximate haversine distance between edge endpoints as fallback.
+    Graphs built by OSMnx normally have lengths already; then this is a single scan
+    and G is returned untouched. Otherwise use the osmnx helper if this version has
+    one, or compute an approximate haversine distance between edge endpoints as fallback.
     Returns the possibly-updated graph (some osmnx helpers return a new graph).
     """
-    # Try ox.add_edge_lengths (older/newer versions may expose it at module level)
-    try:
-        if hasattr(ox, 'add_edge_lengths') and callable(getattr(ox, 'add_edge_lengths')):
-            logger.debug('Using ox.add_edge_lengths')
-            return ox.add_edge_lengths(G)
-    except Exception as e:
-        logger.warning('ox.add_edge_lengths raised: %s', e)
+    missing = [(u, v, data) for u, v, data in G.edges(data=True) if not data.get('length')]
+    if not missing:
+        return G
 
-    # Try osmnx.utils_graph.add_edge_lengths
-    try:
-        from osmnx import utils_graph as _ug
-
-        if hasattr(_ug, 'add_edge_lengths') and callable(getattr(_ug, 'add_edge_lengths')):
-            logger.debug('Using osmnx.utils_graph.add_edge_lengths')
-            return _ug.add_edge_lengths(G)
-    except Exception as e:
-        logger.warning('osmnx.utils_graph.add_edge_lengths raised: %s', e)
+    add_edge_lengths = _ox_add_edge_lengths()
+    if add_edge_lengths is not None:
+        try:
+            logger.debug('Using %s.add_edge_lengths', add_edge_lengths.__module__)
+            return add_edge_lengths(G)
+        except Exception as e:
+            logger.warning('osmnx add_edge_lengths raised: %s', e)
 
     # Last-resort: compute approximate lengths from node coordinates
     logger.warning('Falling back to approximate haversine-based edge lengths')
-    coords = {n: (G.nodes[n].get('y'), G.nodes[n].get('x')) for n in G.nodes}
-    for u, v, k, data in G.edges(keys=True, data=True):
-        if data.get('length'):
-            continue
-        a = coords.get(u)
-        b = coords.get(v)
-        if a and b and None not in a and None not in b:
-            try:
-                data['length'] = _haversine(a, b)
-            except Exception:
-                data['length'] = 1.0
-        else:
-            data['length'] = 1.0
+    node_idx, node_y, node_x = _node_coords(G)
+    # missing coordinates are NaN and give a non-finite length
+    iu = np.array([node_idx[u] for u, _, _ in missing], dtype=np.int64)
+    iv = np.array([node_idx[v] for _, v, _ in missing], dtype=np.int64)
+    lengths = _haversine_many(node_y[iu], node_x[iu], node_y[iv], node_x[iv])
+    lengths = np.where(np.isfinite(lengths), lengths, 1.0)
+    for (_, _, data), length in zip(missing, lengths.tolist()):
+        data['length'] = length
     return G
 
 
-def _is_intersection_node(G: nx.MultiDiGraph, node: int) -> bool:
+def _undirected_adjacency(G: nx.MultiDiGraph) -> Dict[Any, Dict[Any, None]]:
+    """Return G's undirected neighbor sets as ``{node: {neighbor: None}}``.
+
+    The intersection logic only needs neighbor enumeration and undirected degree, so a
+    plain dict built in one pass over ``G.edges()`` replaces the NetworkX undirected
+    graph/view machinery. Parallel edges and both directions of a two-way street count
+    once, so degree is the number of distinct neighbors; self-loops are ignored. Dicts
+    keep insertion order, which keeps traversal deterministic. Cached on ``G.graph``.
+    """
+    uadj = G.graph.get('_jadlo_undirected_adj')
+    if uadj is None:
+        uadj = {n: {} for n in G.nodes}
+        for u, v in G.edges():
+            if u != v:
+                uadj[u][v] = None
+                uadj[v][u] = None
+        G.graph['_jadlo_undirected_adj'] = uadj
+    return uadj
+
+
+def _is_intersection_node(G: nx.MultiDiGraph, node: int, uadj: Dict[Any, Dict[Any, None]] | None = None) -> bool:
     """Decide whether a node is an intersection/endpoint. Use undirected degree.
 
     Intersection defined as node with undirected degree != 2 (i.e., junction or dead-end).
+    ``uadj`` defaults to the graph's cached _undirected_adjacency.
+    """
+    if uadj is None:
+        uadj = _undirected_adjacency(G)
+    return len(uadj[node]) != 2
+
+
+def _pick_edge(ed: Dict[Any, Dict[str, Any]]) -> Tuple[Any, Dict[str, Any]]:
+    """Return ``(key, data)`` of the cheapest of several parallel edges.
+
+    ``ed`` is the key -> data dict from ``G.get_edge_data(u, v)``; edges are compared by
+    'weight' (falling back to 'length'), so the same edge wins as in the shortest path.
     """
-    Gu = G.to_undirected(reciprocal=False)
-    deg = Gu.degree(node)
-    return deg != 2
+    if len(ed) == 1:
+        return next(iter(ed.items()))
+    return min(ed.items(), key=lambda kd: kd[1].get('weight', kd[1].get('length', inf)))
 
 
-def simplify_graph_to_intersections(G: nx.MultiDiGraph) -> nx.DiGraph:
+def simplify_graph_to_intersections(G: nx.MultiDiGraph, uadj: Dict[Any, Dict[Any, None]] | None = None, weights: np.ndarray | None = None) -> nx.DiGraph:
     """Simplified, defensive implementation: collapse chains of degree-2 nodes.
 
     This version is intentionally conservative and robust: it only relies on basic
     undirected traversal and node coordinates, and bails out cleanly on unexpected data.
+    ``uadj`` is G's undirected adjacency (see _undirected_adjacency).
+    ``weights`` are per-edge routing weights in ``G.edges(keys=True)`` order (see
+    _edge_weights); without them the edges' 'weight' (or 'length') attribute is summed.
     """
     try:
-        Gu = G.to_undirected(reciprocal=False)
+        if uadj is None:
+            uadj = _undirected_adjacency(G)
+        edge_pos = _edge_positions(G) if weights is not None else None
         H = nx.DiGraph()
 
-        # safe coordinate extractor with fallbacks
+        node_idx, node_y, node_x = _node_coords(G)
+        ys = node_y.tolist()
+        xs = node_x.tolist()
+
+        # (lat, lon) of a node, or None if it has no coordinates (NaN != NaN)
         def node_coord(n):
-            nd = G.nodes.get(n, {})
-            y = nd.get('y') or nd.get('lat')
-            x = nd.get('x') or nd.get('lon') or nd.get('lon_deg')
-            if y is None or x is None:
+            i = node_idx.get(n)
+            if i is None or ys[i] != ys[i] or xs[i] != xs[i]:
                 return None
-            return (y, x)
-
-        coords = {n: node_coord(n) for n in G.nodes}
+            return (ys[i], xs[i])
 
         # build set of intersections (undirected degree != 2)
-        intersections = {n for n in G.nodes if Gu.degree(n) != 2}
+        intersections = {n for n, nbrs in uadj.items() if len(nbrs) != 2}
 
         # ensure intersection nodes present in H with coords
         for n in intersections:
-            c = coords.get(n)
+            c = node_coord(n)
             if c:
                 H.add_node(n, y=c[0], x=c[1])
             else:
@@ -305,21 +709,25 @@ def simplify_graph_to_intersections(G: nx.MultiDiGraph) -> nx.DiGraph:
         # For each intersection, walk each neighbor chain until next intersection
         MAX_HOPS = 5000
         for n in intersections:
-            for nbr in Gu[n]:
+            for nbr in uadj[n]:
                 # walk forward from n -> nbr until we hit another intersection or max hops
                 path = [n]
+                seen = {n}
                 prev = n
                 cur = nbr
                 hops = 0
                 while cur not in intersections and hops < MAX_HOPS:
                     path.append(cur)
-                    # next nodes excluding the one we came from
-                    nexts = [x for x in Gu[cur] if x != prev]
-                    if not nexts:
+                    seen.add(cur)
+                    # next node excluding the one we came from (cur has degree 2, so no list needed)
+                    for nxt in uadj[cur]:
+                        if nxt != prev:
+                            break
+                    else:
                         break
-                    prev, cur = cur, nexts[0]
+                    prev, cur = cur, nxt
                     # detect simple cycles
-                    if cur in path:
+                    if cur in seen:
                         break
                     hops += 1
 
@@ -333,16 +741,32 @@ def simplify_graph_to_intersections(G: nx.MultiDiGraph) -> nx.DiGraph:
                 # Prefer to build geometry by concatenating original edge geometries when present.
                 geom_edges: List[Tuple[float, float]] = []
                 total_len = 0.0
+                # routing weight accumulated from the per-edge weights computed on G
+                total_weight = 0.0
                 seq = path + [cur]
                 for i in range(len(seq) - 1):
                     u = seq[i]
                     v = seq[i + 1]
-                    ed = G.get_edge_data(u, v) or G.get_edge_data(v, u)
+                    eu, ev = u, v
+                    ed = G.get_edge_data(u, v)
+                    if not ed:
+                        eu, ev = v, u
+                        ed = G.get_edge_data(v, u)
                     if not ed:
                         continue
-                    data = next(iter(ed.values()))
+                    if len(ed) == 1:
+                        key, data = next(iter(ed.items()))
+                    elif edge_pos is not None:
+                        key = min(ed, key=lambda k: weights[edge_pos[(eu, ev, k)]])
+                        data = ed[key]
+                    else:
+                        key, data = _pick_edge(ed)
                     # sum lengths if available
                     total_len += data.get('length', 0.0)
+                    if edge_pos is not None:
+                        total_weight += weights[edge_pos[(eu, ev, key)]]
+                    else:
+                        total_weight += data.get('weight', data.get('length', 0.0))
                     # if this edge carries a shapely geometry, use its coordinates
                     geom_obj = data.get('geometry')
                     if geom_obj is not None:
@@ -356,16 +780,16 @@ def simplify_graph_to_intersections(G: nx.MultiDiGraph) -> nx.DiGraph:
                                 geom_edges.extend(conv)
                         except Exception:
                             # fallback to node coords if geometry extraction fails
-                            c_u = coords.get(u)
-                            c_v = coords.get(v)
+                            c_u = node_coord(u)
+                            c_v = node_coord(v)
                             if c_u and (not geom_edges or geom_edges[-1] != c_u):
                                 geom_edges.append(c_u)
                             if c_v:
                                 geom_edges.append(c_v)
                     else:
                         # no geometry on edge: fallback to node coords
-                        c_u = coords.get(u)
-                        c_v = coords.get(v)
+                        c_u = node_coord(u)
+                        c_v = node_coord(v)
                         if c_u and (not geom_edges or geom_edges[-1] != c_u):
                             geom_edges.append(c_u)
                         if c_v:
@@ -377,7 +801,7 @@ def simplify_graph_to_intersections(G: nx.MultiDiGraph) -> nx.DiGraph:
                 else:
                     geom = []
                     for p in seq:
-                        c = coords.get(p)
+                        c = node_coord(p)
                         if c:
                             if not geom or geom[-1] != c:
                                 geom.append(c)
@@ -385,6 +809,8 @@ def simplify_graph_to_intersections(G: nx.MultiDiGraph) -> nx.DiGraph:
                 # compute fallback length if not present
                 if total_len == 0.0 and len(geom) >= 2:
                     total_len = _haversine(geom[0], geom[-1])
+                if total_weight == 0.0:
+                    total_weight = total_len
 
                 # compute initial bearing (if possible)
                 bearing = None
@@ -406,7 +832,7 @@ def simplify_graph_to_intersections(G: nx.MultiDiGraph) -> nx.DiGraph:
                     # prefer shorter aggregated segment
                     if H[n][cur].get('length', float('inf')) <= total_len:
                         continue
-                H.add_edge(n, cur, length=total_len, geometry=geom, bearing=bearing, highway=highway, surface=surface)
+                H.add_edge(n, cur, length=total_len, weight=total_weight, geometry=geom, nodes=seq, bearing=bearing, highway=highway, surface=surface)
 
         return H
     except Exception as e:
@@ -415,105 +841,488 @@ def simplify_graph_to_intersections(G: nx.MultiDiGraph) -> nx.DiGraph:
         return nx.DiGraph()
 
 
-def compute_route_intersections(start: Tuple[float, float], end: Tuple[float, float], params: Dict[str, Any], radius_meters: float | None = None, heading_threshold_deg: float = 60.0):
-    """Compute a route on a simplified intersection graph using A*.
+_GPX_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<gpx xmlns="http://www.topografix.com/GPX/1/1" '
+    'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+    'xsi:schemaLocation="http://www.topografix.com/GPX/1/1 http://www.topografix.com/GPX/1/1/gpx.xsd" '
+    'version="1.1" creator="Jadlo">\n'
+    '  <trk>\n'
+    '    <trkseg>\n'
+)
+_GPX_FOOTER = (
+    '    </trkseg>\n'
+    '  </trk>\n'
+    '</gpx>\n'
+)
 
-    This method reduces memory by collapsing degree-2 nodes and making decisions only at
-    intersections. It also applies a heading bias: edges whose bearing deviates strongly
-    from the direction to the final goal can receive an additional penalty unless they match
-    user's preferences.
+
+_GPX_TRKPT = '      <trkpt lat="%.7f" lon="%.7f"/>\n'
+
+
+def _coords_to_gpx(coords: List[Tuple[float, float]]) -> str:
+    """Render (lat, lon) pairs as a single-track GPX 1.1 document.
+
+    The document has no names, times or elevations, so it is written directly as text
+    instead of building a gpxpy object per point and serializing the tree. Coordinates
+    are written with 7 decimals (~1 cm).
     """
-    lat1, lon1 = start
-    lat2, lon2 = end
+    return ''.join([_GPX_HEADER, *[_GPX_TRKPT % (lat, lon) for lat, lon in coords], _GPX_FOOTER])
+
+
+def write_gpx(f, coords: List[Tuple[float, float]], chunk_size: int = 4096) -> None:
+    """Write (lat, lon) pairs to the text file ``f`` as the document _coords_to_gpx returns.
+
+    Points are formatted and written ``chunk_size`` at a time, so long stitched routes
+    are streamed to disk without holding the whole XML string in memory.
+    """
+    f.write(_GPX_HEADER)
+    for i in range(0, len(coords), chunk_size):
+        f.write(''.join([_GPX_TRKPT % (lat, lon) for lat, lon in coords[i:i + chunk_size]]))
+    f.write(_GPX_FOOTER)
+
+
+GRAPH_CACHE_SIZE = int(os.getenv('JADLO_GRAPH_CACHE_SIZE', '4'))
+# Directory for pickled graphs shared across processes and restarts; empty disables it.
+GRAPH_CACHE_DIR = os.getenv(
+    'JADLO_GRAPH_CACHE_DIR',
+    os.path.join(os.path.dirname(__file__), '..', 'artifacts', 'graph_cache'),
+)
+# Size budget for GRAPH_CACHE_DIR in MB; the least recently used graphs are removed
+# when a new one pushes the directory over it. 0 means unbounded.
+GRAPH_CACHE_MAX_MB = float(os.getenv('JADLO_GRAPH_CACHE_MAX_MB', '1024'))
+# Read from package metadata, so building cache keys does not import OSMnx
+_OSMNX_VERSION = importlib.metadata.version('osmnx')
+# Bump when the arrays cached on G.graph change shape, to invalidate pickled graphs
+_GRAPH_CACHE_FORMAT = 1
+# Concurrent Overpass downloads for bbox graphs; above 1 the bbox is split into quadrants.
+FETCH_WORKERS = int(os.getenv('JADLO_FETCH_WORKERS', '1'))
+
+
+def _graph_from_bbox_parallel(n: float, s: float, e: float, w: float) -> nx.MultiDiGraph:
+    """Download a bbox as four quadrants concurrently and merge them into one graph.
+
+    Overpass I/O dominates bbox fetches and releases the GIL, so the wall time drops to
+    roughly the slowest quadrant. Quadrants are fetched unsimplified and with edges
+    crossing their borders kept, so their union is a superset of the raw graph a single
+    query downloads, reaching past the bbox. It is then processed the way
+    graph_from_bbox does: simplified once, truncated to (n, s, e, w) and reduced to its
+    largest component, so no nodes outside the bbox are kept. Falls back to a single
+    query if a quadrant comes back empty.
+    """
+    ox = _osmnx()
+    lat_mid = (n + s) / 2
+    lon_mid = (e + w) / 2
+    quadrants = [
+        (n, lat_mid, e, lon_mid),
+        (n, lat_mid, lon_mid, w),
+        (lat_mid, s, e, lon_mid),
+        (lat_mid, s, lon_mid, w),
+    ]
+
+    def fetch(bbox):
+        return ox.graph_from_bbox(*bbox, network_type='bike', simplify=False, retain_all=True, truncate_by_edge=True)
+
+    try:
+        with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as pool:
+            parts = list(pool.map(fetch, quadrants))
+    except (ox._errors.EmptyOverpassResponse, ValueError) as exc:
+        logger.warning('quadrant fetch failed (%s), fetching bbox in one query', exc)
+        return ox.graph_from_bbox(n, s, e, w, network_type='bike')
+
+    G_buff = ox.simplify_graph(nx.compose_all(parts))
+    G = ox.truncate.truncate_graph_bbox(G_buff, n, s, e, w)
+    # street counts from the untruncated graph, so border intersections keep their true count
+    nx.set_node_attributes(G, ox.stats.count_streets_per_node(G_buff, nodes=G.nodes), name='street_count')
+    return G
+
+
+def _graph_cache_path(query: Tuple) -> str | None:
+    """Return the on-disk cache file for a normalized graph query, or None if disabled.
+
+    The key covers the query, the network type, the OSMnx version and the layout of the
+    arrays cached on ``G.graph``, so upgrades do not load incompatible pickles. Files
+    are zstd-compressed ('.pkl.zst') when the optional ``zstandard`` package is
+    installed: OSM tag strings compress several-fold, at a speed well above disk
+    throughput.
+    """
+    if not GRAPH_CACHE_DIR:
+        return None
+    key = hashlib.blake2b(repr((query, 'bike', _OSMNX_VERSION, _GRAPH_CACHE_FORMAT)).encode(), digest_size=8).hexdigest()
+    ext = '.pkl.zst' if zstandard is not None else '.pkl'
+    return os.path.join(GRAPH_CACHE_DIR, key + ext)
+
+
+# Read/write buffer for cached graph files
+_PICKLE_BUFFER_SIZE = 1 << 20
+
+
+def _read_cached_graph(path: str) -> nx.MultiDiGraph | None:
+    """Load a pickled graph, or return None if it is missing or unreadable.
+
+    The unpickler issues many small reads; a buffered wrapper serves them from memory
+    instead of calling into the decompressor for each one (~20% faster loads).
+    """
+    try:
+        with open(path, 'rb') as f:
+            # bump the mtime so _prune_graph_cache evicts least recently used graphs
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+            if path.endswith('.zst'):
+                reader = zstandard.ZstdDecompressor().stream_reader(f, read_size=_PICKLE_BUFFER_SIZE)
+                with io.BufferedReader(reader, _PICKLE_BUFFER_SIZE) as buffered:
+                    return pickle.load(buffered)
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning('ignoring unreadable graph cache file %s: %s', path, e)
+        return None
+
+
+def _write_cached_graph(path: str, G: nx.MultiDiGraph) -> None:
+    """Pickle G to path atomically; failures are logged, never raised.
+
+    The data is fsynced before the rename, so a crash cannot leave an empty or
+    truncated file under the final name for a later run to trip over.
+    """
+    tmp = f'{path}.{os.getpid()}.tmp'
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp, 'wb', buffering=_PICKLE_BUFFER_SIZE) as f:
+            if path.endswith('.zst'):
+                with zstandard.ZstdCompressor(level=3).stream_writer(f, closefd=False) as writer:
+                    pickle.dump(G, writer, protocol=pickle.HIGHEST_PROTOCOL)
+            else:
+                pickle.dump(G, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        # readers never see a partially written file
+        os.replace(tmp, path)
+    except Exception as e:
+        logger.warning('could not write graph cache file %s: %s', path, e)
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        return
+    if GRAPH_CACHE_MAX_MB > 0:
+        _prune_graph_cache(path)
+
+
+def _prune_graph_cache(keep: str) -> None:
+    """Remove the least recently used graphs until GRAPH_CACHE_DIR fits GRAPH_CACHE_MAX_MB.
+
+    Reads bump a file's mtime, so mtime order is use order. ``keep`` (the graph just
+    written) is never removed, even if it alone exceeds the budget.
+    """
+    entries = []
+    try:
+        with os.scandir(os.path.dirname(keep)) as it:
+            for entry in it:
+                if not entry.name.endswith(('.pkl', '.pkl.zst')):
+                    continue
+                # other workers may remove files while we scan
+                try:
+                    if entry.is_file():
+                        st = entry.stat()
+                        entries.append((st.st_mtime, st.st_size, entry.path))
+                except OSError:
+                    pass
+    except OSError as e:
+        logger.warning('could not scan graph cache %s: %s', os.path.dirname(keep), e)
+        return
+    total = sum(size for _, size, _ in entries)
+    budget = GRAPH_CACHE_MAX_MB * 1024 * 1024
+    keep = os.path.abspath(keep)
+    for _, size, path in sorted(entries):
+        if total <= budget:
+            break
+        if os.path.abspath(path) == keep:
+            continue
+        try:
+            os.remove(path)
+            total -= size
+            logger.info('evicted graph cache file %s', path)
+        except OSError:
+            pass
+
+
+@functools.lru_cache(maxsize=GRAPH_CACHE_SIZE)
+def _load_graph(query: Tuple) -> nx.MultiDiGraph:
+    """Download the bike network for a normalized query and make sure it has edge lengths.
+
+    ``query`` is ``('point', lat, lon, dist)`` or ``('bbox', north, south, east, west)``.
+    The last GRAPH_CACHE_SIZE graphs stay in memory, so repeated requests in the same
+    area skip the Overpass download and graph construction. Built graphs are also
+    pickled under GRAPH_CACHE_DIR, which other workers and later runs load in seconds.
+    Cached graphs are shared between requests and must be treated as read-only.
+    """
+    path = _graph_cache_path(query)
+    if path is not None:
+        logger.info('start: load_cached_graph')
+        t0 = time.perf_counter()
+        G = _read_cached_graph(path)
+        logger.info('done: load_cached_graph — took %.2f seconds', time.perf_counter() - t0)
+        if G is not None:
+            return _register_graph(G)
 
     logger.info('start: fetch_graph')
     t0 = time.perf_counter()
-    if radius_meters is not None:
-        G = ox.graph_from_point((lat1, lon1), dist=radius_meters, network_type='bike')
+    ox = _osmnx()
+    if query[0] == 'point':
+        _, lat, lon, dist = query
+        G = ox.graph_from_point((lat, lon), dist=dist, network_type='bike')
     else:
-        # build bbox around start/end with a small buffer
-        buf = 0.12
-        n = max(lat1, lat2) + buf
-        s = min(lat1, lat2) - buf
-        e = max(lon1, lon2) + buf
-        w = min(lon1, lon2) - buf
-        G = ox.graph_from_bbox(n, s, e, w, network_type='bike')
+        _, n, s, e, w = query
+        if FETCH_WORKERS > 1:
+            G = _graph_from_bbox_parallel(n, s, e, w)
+        else:
+            G = ox.graph_from_bbox(n, s, e, w, network_type='bike')
     logger.info('done: fetch_graph — took %.2f seconds', time.perf_counter() - t0)
 
+    # Ensure the graph has 'length' attributes (robust across osmnx versions)
     logger.info('start: ensure_edge_lengths')
     t0 = time.perf_counter()
     G = _ensure_edge_lengths(G)
     logger.info('done: ensure_edge_lengths — took %.2f seconds', time.perf_counter() - t0)
 
-    # compute edge weights on the original graph so we can reconstruct detailed
-    # segments between intersections using the full-resolution data
+    # Build the per-graph arrays now, so they are pickled with the graph and requests on
+    # a freshly loaded graph do not have to walk its edge dicts
+    logger.info('start: precompute_graph_arrays')
+    t0 = time.perf_counter()
+    _edge_columns(G)
+    _csr_topology(G)
+    logger.info('done: precompute_graph_arrays — took %.2f seconds', time.perf_counter() - t0)
+
+    if path is not None:
+        _write_cached_graph(path, G)
+    return _register_graph(G)
+
+
+# Per-load graph ids that key _route_path, and the loaded graphs they refer to. Graphs
+# evicted from _load_graph drop out of _LOADED_GRAPHS once no request holds them.
+_GRAPH_IDS = itertools.count()
+_LOADED_GRAPHS: 'weakref.WeakValueDictionary[int, nx.MultiDiGraph]' = weakref.WeakValueDictionary()
+
+
+def _register_graph(G: nx.MultiDiGraph) -> nx.MultiDiGraph:
+    """Give a freshly loaded graph a new id in ``G.graph['_jadlo_graph_id']`` and return it.
+
+    A graph reloaded after eviction gets a new id even for the same query, so paths
+    memoized for the old one (node indices that depend on its node order) are never
+    reused on it.
+    """
+    graph_id = next(_GRAPH_IDS)
+    G.graph['_jadlo_graph_id'] = graph_id
+    _LOADED_GRAPHS[graph_id] = G
+    return G
+
+
+# Striped locks that serialize _load_graph per query (see _get_graph)
+_GRAPH_LOCKS = [threading.Lock() for _ in range(64)]
+
+
+def _get_graph(query: Tuple) -> nx.MultiDiGraph:
+    """Return the cached graph for ``query``, loading it at most once under concurrency.
+
+    Requests run in worker threads, and lru_cache does not stop several threads that
+    miss at the same time from each downloading the same area. Holding a per-query lock
+    around the lookup makes concurrent cold requests for one area wait for a single
+    download, while requests for other areas proceed in parallel.
+    """
+    with _GRAPH_LOCKS[hash(query) % len(_GRAPH_LOCKS)]:
+        return _load_graph(query)
+
+
+def _fetch_graph(start: Tuple[float, float], end: Tuple[float, float], bbox_buffer: float = 0.12, radius_meters: float | None = None, bbox: Tuple[float, float, float, float] | None = None) -> nx.MultiDiGraph:
+    """Return the bike graph for a route request: a circle around start or a buffered bbox."""
+    return _get_graph(_graph_query(start, end, bbox_buffer, radius_meters, bbox))
+
+
+# Grid (degrees) that point-query centers snap to, see _graph_query
+POINT_SNAP_DEG = float(os.getenv('JADLO_POINT_SNAP_DEG', '0.005'))
+# One degree of latitude; a degree of longitude is never longer
+_METERS_PER_DEG_LAT = 111320.0
+
+
+def _graph_query(start: Tuple[float, float], end: Tuple[float, float], bbox_buffer: float = 0.12, radius_meters: float | None = None, bbox: Tuple[float, float, float, float] | None = None) -> Tuple:
+    """Return the normalized _load_graph query for a route request.
+
+    An explicit ``bbox`` (north, south, east, west) takes precedence over the other
+    options, so routes between different points can share one graph. bbox corners are
+    snapped outwards to 0.001 degrees (~100 m), so nearby requests share a cached graph
+    and the bbox still covers the requested area. Point queries snap the center to a
+    coarser POINT_SNAP_DEG grid, so consecutive calls around the same place (segment
+    retries, gap bridging, redrawn routes) reuse one download; the radius grows by the
+    largest possible shift, so the requested area stays covered.
+    """
+    lat1, lon1 = start
+    lat2, lon2 = end
+    if bbox is not None:
+        n, s, e, w = bbox
+        query = ('bbox', ceil(n * 1000) / 1000, floor(s * 1000) / 1000, ceil(e * 1000) / 1000, floor(w * 1000) / 1000)
+    elif radius_meters is not None:
+        # Use graph_from_point with radius in meters (smaller, more predictable area for tests)
+        query = (
+            'point',
+            round(round(lat1 / POINT_SNAP_DEG) * POINT_SNAP_DEG, 6),
+            round(round(lon1 / POINT_SNAP_DEG) * POINT_SNAP_DEG, 6),
+            float(radius_meters) + ceil(POINT_SNAP_DEG / 2 * _METERS_PER_DEG_LAT),
+        )
+    else:
+        # Simple bbox with buffer (degrees). For long routes this can be very large — PoC only.
+        buf = float(bbox_buffer)
+        query = (
+            'bbox',
+            ceil((max(lat1, lat2) + buf) * 1000) / 1000,
+            floor((min(lat1, lat2) - buf) * 1000) / 1000,
+            ceil((max(lon1, lon2) + buf) * 1000) / 1000,
+            floor((min(lon1, lon2) - buf) * 1000) / 1000,
+        )
+    return query
+
+
+ROUTE_CACHE_SIZE = int(os.getenv('JADLO_ROUTE_CACHE_SIZE', '1024'))
+
+
+@functools.lru_cache(maxsize=ROUTE_CACHE_SIZE)
+def _route_path(graph_id: int, orig_node, dest_node, penalty_key: Tuple[float, ...]) -> np.ndarray:
+    """Shortest path between two nodes of a loaded graph under the given preferences.
+
+    ``graph_id`` is the graph's ``'_jadlo_graph_id'`` (see _register_graph); the caller
+    holds the graph, so it is still in _LOADED_GRAPHS.
+
+    The path is returned as node indices (see _shortest_path_idx), so coordinates are
+    gathered from the _node_coords arrays without looking node ids up again. The array
+    is shared between callers and read-only. Memoized: redrawing the same route, or
+    requests whose endpoints snap to the same nodes, skip the weight computation and
+    Dijkstra. ``penalty_key`` comes from _penalty_key, so entries are shared only
+    between identical weightings.
+    """
+    G = _LOADED_GRAPHS[graph_id]
+
+    # Compute a weight for each edge (kept as an array aligned with G.edges, not written to G)
+    logger.info('start: compute_edge_weights')
+    t0 = time.perf_counter()
+    weights = _edge_weights(_edge_columns(G), dict(zip(_PENALTY_DEFAULTS, penalty_key)))
+    logger.info('done: compute_edge_weights — took %.2f seconds', time.perf_counter() - t0)
+
+    # shortest path (Dijkstra) over the computed weights
+    logger.info('start: shortest_path')
+    t0 = time.perf_counter()
+    path = _shortest_path_idx(G, weights, orig_node, dest_node)
+    logger.info('done: shortest_path — took %.2f seconds', time.perf_counter() - t0)
+    path.flags.writeable = False
+    return path
+
+
+def _nearest_intersection(uadj: Dict[Any, Dict[Any, None]], node, intersections):
+    """Return the intersection closest to ``node`` in hops (``node`` itself if it is one).
+
+    Breadth-first walk over the undirected adjacency that stops as soon as an
+    intersection is discovered, which is usually within a few hops: the search only
+    crosses the degree-2 chain the node sits on. Returns ``node`` if none is reachable.
+    """
+    if node in intersections:
+        return node
+    q = deque([node])
+    seen = {node}
+    while q:
+        u = q.popleft()
+        for v in uadj[u]:
+            if v in seen:
+                continue
+            # BFS pops nodes in discovery order, so the first intersection discovered
+            # is the one the queue would have returned first
+            if v in intersections:
+                return v
+            seen.add(v)
+            q.append(v)
+    return node
+
+
+def compute_route_intersections(start: Tuple[float, float], end: Tuple[float, float], params: Dict[str, Any], radius_meters: float | None = None, heading_threshold_deg: float = 60.0, bbox: Tuple[float, float, float, float] | None = None):
+    """Compute a route on a simplified intersection graph using A*.
+
+    This method reduces memory by collapsing degree-2 nodes and making decisions only at
+    intersections. It also applies a heading bias: edges whose bearing deviates strongly
+    from the direction to the final goal can receive an additional penalty unless they match
+    user's preferences. ``bbox`` (north, south, east, west) routes on a shared graph
+    instead, as in compute_route.
+    """
+    lat1, lon1 = start
+    lat2, lon2 = end
+
+    G = _fetch_graph(start, end, radius_meters=radius_meters, bbox=bbox)
+
+    # compute edge weights on the original graph so we can aggregate them along the
+    # chains between intersections (kept as an array: G may be a shared cached graph)
     logger.info('start: compute_edge_weights_on_original')
     t0 = time.perf_counter()
-    for u, v, k, data in G.edges(keys=True, data=True):
-        try:
-            data['weight'] = _edge_penalty(u, v, k, data, params)
-        except Exception:
-            data['weight'] = data.get('length', 1.0)
+    weights = _edge_weights(_edge_columns(G), params)
     logger.info('done: compute_edge_weights_on_original — took %.2f seconds', time.perf_counter() - t0)
 
     logger.info('start: simplify_graph')
     t0 = time.perf_counter()
-    H = simplify_graph_to_intersections(G)
+    uadj = _undirected_adjacency(G)
+    H = simplify_graph_to_intersections(G, uadj, weights)
     logger.info('done: simplify_graph — took %.2f seconds', time.perf_counter() - t0)
 
     if len(H) == 0:
         # fallback to original compute_route
-        return compute_route(start, end, params, radius_meters=radius_meters)
+        return compute_route(start, end, params, radius_meters=radius_meters, bbox=bbox)
 
     # find nearest intersection nodes to origin and destination
-    orig_node = ox.distance.nearest_nodes(G, lon1, lat1)
-    dest_node = ox.distance.nearest_nodes(G, lon2, lat2)
+    orig_node, dest_node = _nearest_nodes(G, [start, end])
 
     # if nearest nodes are not intersection nodes, find nearest intersection by walking
-    def nearest_intersection(node):
-        if node in H.nodes:
-            return node
-        # BFS until intersection
-        Gu = G.to_undirected(reciprocal=False)
-        from collections import deque
-
-        q = deque([node])
-        seen = {node}
-        while q:
-            u = q.popleft()
-            if u in H.nodes:
-                return u
-            for v in Gu[u]:
-                if v in seen:
-                    continue
-                seen.add(v)
-                q.append(v)
-        return node
-
-    s_node = nearest_intersection(orig_node)
-    t_node = nearest_intersection(dest_node)
-
-    # prepare heuristic for A*
-    goal_coord = (lat2, lon2)
-
-    def heuristic(u, v=None):
-        cu = (H.nodes[u]['y'], H.nodes[u]['x'])
-        return _haversine(cu, goal_coord)
-
-    # compute edge weights with heading bias and user preferences
-    for u, v, data in H.edges(data=True):
-        # base weight = length * penalty
-        fake_data = {'length': data.get('length', 1.0), 'highway': data.get('highway'), 'surface': data.get('surface')}
-        base = _edge_penalty(u, v, 0, fake_data, params)
+    s_node = _nearest_intersection(uadj, orig_node, H.nodes)
+    t_node = _nearest_intersection(uadj, dest_node, H.nodes)
+
+    # apply heading bias on top of the preference weights accumulated during simplification,
+    # vectorized over all H edges
+    h_edges = list(H.edges(data=True))
+    if h_edges:
+        n_edges = len(h_edges)
+        base = np.fromiter((d.get('weight', d.get('length', 1.0)) for _, _, d in h_edges), np.float64, n_edges)
+        # edges without a bearing get NaN, which never exceeds the threshold (no penalty)
+        edge_bearing = np.array([d.get('bearing') for _, _, d in h_edges], dtype=np.float64)
+        start_lat = np.fromiter((H.nodes[u]['y'] for u, _, _ in h_edges), np.float64, n_edges)
+        start_lon = np.fromiter((H.nodes[u]['x'] for u, _, _ in h_edges), np.float64, n_edges)
         # heading penalty: compare edge bearing to bearing from edge start to goal
-        start_coord = (H.nodes[u]['y'], H.nodes[u]['x'])
-        edge_bearing = data.get('bearing', 0.0)
-        desired_bearing = _bearing(start_coord, goal_coord)
-        diff = abs((edge_bearing - desired_bearing + 180) % 360 - 180)
+        desired_bearing = _bearing_many(start_lat, start_lon, lat2, lon2)
+        diff = np.abs((edge_bearing - desired_bearing + 180) % 360 - 180)
         # if deviation is larger than threshold, add multiplicative penalty
-        if diff > heading_threshold_deg:
-            base *= 1.5 + (diff - heading_threshold_deg) / 180.0
-        data['weight'] = base
+        penalty = np.where(diff > heading_threshold_deg, 1.5 + (diff - heading_threshold_deg) / 180.0, 1.0)
+        h_weights = base * penalty
+        for (_, _, data), wgt in zip(h_edges, h_weights.tolist()):
+            data['weight'] = wgt
+
+    # A* heuristic: straight-line distance to the target intersection, scaled by the lowest
+    # weight per meter in H. Preferences can make an edge cost less than its length (e.g.
+    # cycleways), and the scaling keeps the heuristic admissible, so A* stays exact.
+    # Precomputed for all intersections in one vectorized pass.
+    scale = 1.0
+    if h_edges:
+        h_lengths = np.fromiter((d.get('length', 0.0) for _, _, d in h_edges), np.float64, len(h_edges))
+        per_meter = h_weights[h_lengths > 0] / h_lengths[h_lengths > 0]
+        if per_meter.size:
+            scale = min(1.0, max(0.0, float(per_meter.min())))
+    h_nodes = list(H.nodes)
+    h_lat = np.array([H.nodes[n].get('y') for n in h_nodes], dtype=np.float64)
+    h_lon = np.array([H.nodes[n].get('x') for n in h_nodes], dtype=np.float64)
+    t_data = H.nodes[t_node] if t_node in H else {}
+    t_lat = t_data.get('y', lat2)
+    t_lon = t_data.get('x', lon2)
+    h_dist = scale * _haversine_many(h_lat, h_lon, t_lat, t_lon)
+    # nodes without coordinates get 0, which is always admissible
+    h_dist = dict(zip(h_nodes, np.where(np.isfinite(h_dist), h_dist, 0.0).tolist()))
+
+    def heuristic(u, v=None):
+        return h_dist[u]
 
     try:
         logger.info('start: astar_search')
@@ -523,96 +1332,55 @@ def compute_route_intersections(start: Tuple[float, float], end: Tuple[float, fl
     except Exception:
         # fallback to original compute_route
         logger.exception('A* on intersection graph failed, falling back to compute_route')
-        return compute_route(start, end, params, radius_meters=radius_meters)
+        return compute_route(start, end, params, radius_meters=radius_meters, bbox=bbox)
 
     # Reconstruct full coordinates using pre-computed geometry from simplified graph.
-    # This avoids expensive re-routing and uses the geometry already stored during simplification.
+    # Each H edge carries the concatenated geometry and original node sequence of its chain,
+    # so no re-routing on G is needed.
     coords: List[Tuple[float, float]] = []
     logger.info('start: reconstruct_coords_from_simplified_graph')
     t0 = time.perf_counter()
 
-    # helper map of node coords for quick fallback
-    coords_map = {n: (G.nodes[n].get('y'), G.nodes[n].get('x')) for n in G.nodes}
+    # node coordinates for chains without geometry (shared with the simplification step)
+    node_idx, node_y, node_x = _node_coords(G)
 
     for i in range(len(path) - 1):
         a = path[i]
         b = path[i + 1]
-        
-        # Use pre-computed geometry from simplified graph H
-        # Try both directions since H is a DiGraph
-        edge_data = H.get_edge_data(a, b) or H.get_edge_data(b, a)
+
+        # H is a DiGraph; if only the opposite edge exists, walk its chain backwards
+        edge_data = H.get_edge_data(a, b)
+        reverse = False
+        if edge_data is None:
+            edge_data = H.get_edge_data(b, a)
+            reverse = edge_data is not None
         geom = edge_data.get('geometry') if edge_data else None
-        
-        if geom is not None and len(geom) > 0:
+
+        if geom:
             # Add geometry points, avoiding duplicates at segment boundaries
-            for pt in geom:
+            for pt in (reversed(geom) if reverse else geom):
                 if not coords or coords[-1] != pt:
                     coords.append(pt)
-        elif geom is not None:
-            # geometry exists but is empty, fallback to node coords
-            ca = coords_map.get(a)
-            cb = coords_map.get(b)
-            if ca and (not coords or coords[-1] != ca):
-                coords.append(ca)
-            if cb:
-                coords.append(cb)
-        else:
-            # Fallback: no geometry in H, try routing on original graph
-            # This should rarely happen if simplification worked correctly
-            try:
-                seg_nodes = nx.shortest_path(G, a, b, weight='weight')
-            except (nx.NetworkXNoPath, nx.NetworkXError):
-                try:
-                    seg_nodes = nx.shortest_path(G, a, b, weight='length')
-                except (nx.NetworkXNoPath, nx.NetworkXError):
-                    # unable to reconstruct this segment; use straight line between nodes
-                    logger.warning('unable to reconstruct segment %s -> %s, using straight line between nodes', a, b)
-                    ca = coords_map.get(a)
-                    cb = coords_map.get(b)
-                    if ca and (not coords or coords[-1] != ca):
-                        coords.append(ca)
-                    if cb:
-                        coords.append(cb)
-                    continue
-
-            # convert the sequence of nodes into coordinates using original edge geometries
-            for j in range(len(seg_nodes) - 1):
-                u = seg_nodes[j]
-                v = seg_nodes[j + 1]
-                ed = G.get_edge_data(u, v) or G.get_edge_data(v, u)
-                if not ed:
-                    # fallback to node coords
-                    cu = coords_map.get(u)
-                    cv = coords_map.get(v)
-                    if cu and (not coords or coords[-1] != cu):
-                        coords.append(cu)
-                    if cv:
-                        coords.append(cv)
-                    continue
+            continue
 
-                data = next(iter(ed.values()))
-                geom_obj = data.get('geometry')
-                if geom_obj is not None:
-                    try:
-                        pts = [(lat, lon) for (lon, lat) in geom_obj.coords]
-                        if coords and coords[-1] == pts[0]:
-                            coords.extend(pts[1:])
-                        else:
-                            coords.extend(pts)
-                    except Exception:
-                        cu = coords_map.get(u)
-                        cv = coords_map.get(v)
-                        if cu and (not coords or coords[-1] != cu):
-                            coords.append(cu)
-                        if cv:
-                            coords.append(cv)
-                else:
-                    cu = coords_map.get(u)
-                    cv = coords_map.get(v)
-                    if cu and (not coords or coords[-1] != cu):
-                        coords.append(cu)
-                    if cv:
-                        coords.append(cv)
+        # No usable geometry: use the coordinates of the chain's original nodes, or a
+        # straight line between the two intersections if the chain is unknown
+        chain = edge_data.get('nodes') if edge_data else None
+        if not chain:
+            logger.warning('no geometry for segment %s -> %s, using straight line between nodes', a, b)
+            chain = [a, b]
+        elif reverse:
+            chain = chain[::-1]
+        for n in chain:
+            i_n = node_idx.get(n)
+            if i_n is None:
+                continue
+            y, x = float(node_y[i_n]), float(node_x[i_n])
+            if y != y or x != x:  # NaN: node without coordinates
+                continue
+            c = (y, x)
+            if not coords or coords[-1] != c:
+                coords.append(c)
 
     logger.info('done: reconstruct_coords_from_simplified_graph — took %.2f seconds', time.perf_counter() - t0)
 
@@ -625,89 +1393,38 @@ def compute_route_intersections(start: Tuple[float, float], end: Tuple[float, fl
     # generate GPX
     logger.info('start: generate_gpx')
     t0 = time.perf_counter()
-    gpx = gpxpy.gpx.GPX()
-    track = gpxpy.gpx.GPXTrack()
-    gpx.tracks.append(track)
-    seg = gpxpy.gpx.GPXTrackSegment()
-    track.segments.append(seg)
-    for lat, lon in coords:
-        seg.points.append(gpxpy.gpx.GPXTrackPoint(lat, lon))
-    gpx_str = gpx.to_xml()
+    gpx_str = _coords_to_gpx(coords)
     logger.info('done: generate_gpx — took %.2f seconds', time.perf_counter() - t0)
 
     return coords, gpx_str
 
 
-def compute_route(start: Tuple[float, float], end: Tuple[float, float], params: Dict[str, Any], bbox_buffer: float = 0.12, radius_meters: float | None = None):
+def compute_route(start: Tuple[float, float], end: Tuple[float, float], params: Dict[str, Any], bbox_buffer: float = 0.12, radius_meters: float | None = None, bbox: Tuple[float, float, float, float] | None = None):
     """PoC: fetch a fragment of the OSM graph between points (bbox with buffer) or around a point (radius_meters),
     compute the shortest route using custom weights.
     Returns list of (lat, lon) and GPX string.
 
+    An explicit ``bbox`` (north, south, east, west) routes on that area instead; callers
+    routing many legs inside one region (e.g. segments of a long trip) pass the same
+    bbox, so the graph is downloaded once and every leg is routed locally.
+
     Note: fetching large graphs for long distances can be expensive; in production prefer a dedicated routing server.
     """
-    lat1, lon1 = start
-    lat2, lon2 = end
-
-    # Decide how to fetch the graph: either bbox between points (default) or circle around start point.
-    logger.info('start: fetch_graph')
-    t0 = time.perf_counter()
-    if radius_meters is not None:
-        # Use graph_from_point with radius in meters (smaller, more predictable area for tests)
-        G = ox.graph_from_point((lat1, lon1), dist=radius_meters, network_type='bike')
-    else:
-        # Simple bbox with buffer (degrees). For long routes this can be very large — PoC only.
-        # `bbox_buffer` allows tests to request a much smaller area (e.g., 0.02 degrees ~ a few km).
-        buf = float(bbox_buffer)
-        n = max(lat1, lat2) + buf
-        s = min(lat1, lat2) - buf
-        e = max(lon1, lon2) + buf
-        w = min(lon1, lon2) - buf
-
-        # Fetch the graph for the bicycle network
-        G = ox.graph_from_bbox(n, s, e, w, network_type='bike')
-    logger.info('done: fetch_graph — took %.2f seconds', time.perf_counter() - t0)
-
-    # Ensure the graph has 'length' attributes (robust across osmnx versions)
-    logger.info('start: ensure_edge_lengths')
-    t0 = time.perf_counter()
-    G = _ensure_edge_lengths(G)
-    logger.info('done: ensure_edge_lengths — took %.2f seconds', time.perf_counter() - t0)
-
-    # Compute a weight for each edge and store it as the 'weight' attribute
-    logger.info('start: compute_edge_weights')
-    t0 = time.perf_counter()
-    for u, v, k, data in G.edges(keys=True, data=True):
-        try:
-            wgt = _edge_penalty(u, v, k, data, params)
-        except Exception:
-            wgt = data.get('length', 1.0)
-        data['weight'] = wgt
-    logger.info('done: compute_edge_weights — took %.2f seconds', time.perf_counter() - t0)
+    # Fetch the graph: either bbox between points (default) or circle around start point.
+    # `bbox_buffer` allows tests to request a much smaller area (e.g., 0.02 degrees ~ a few km).
+    G = _fetch_graph(start, end, bbox_buffer, radius_meters, bbox)
 
     # find nearest nodes to the points
-    orig_node = ox.distance.nearest_nodes(G, lon1, lat1)
-    dest_node = ox.distance.nearest_nodes(G, lon2, lat2)
+    orig_node, dest_node = _nearest_nodes(G, [start, end])
 
-    # shortest path using the 'weight' attribute
-    try:
-        logger.info('start: shortest_path')
-        t0 = time.perf_counter()
-        route_nodes = nx.shortest_path(G, orig_node, dest_node, weight='weight')
-        logger.info('done: shortest_path — took %.2f seconds', time.perf_counter() - t0)
-    except nx.NetworkXNoPath:
-        raise
+    # weighted shortest path; raises nx.NetworkXNoPath if the points are not connected
+    path = _route_path(G.graph['_jadlo_graph_id'], orig_node, dest_node, _penalty_key(params))
 
-    # convert nodes to coordinates
-    coords = [(G.nodes[n]['y'], G.nodes[n]['x']) for n in route_nodes]
+    # convert node indices to coordinates
+    _, node_y, node_x = _node_coords(G)
+    coords = list(zip(node_y[path].tolist(), node_x[path].tolist()))
 
     # generate GPX
-    gpx = gpxpy.gpx.GPX()
-    track = gpxpy.gpx.GPXTrack()
-    gpx.tracks.append(track)
-    seg = gpxpy.gpx.GPXTrackSegment()
-    track.segments.append(seg)
-    for lat, lon in coords:
-        seg.points.append(gpxpy.gpx.GPXTrackPoint(lat, lon))
-    gpx_str = gpx.to_xml()
+    gpx_str = _coords_to_gpx(coords)
 
     return coords, gpx_str
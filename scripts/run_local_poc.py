@@ -1,6 +1,12 @@
 """Prosty skrypt uruchamiający PoC na krótkim fragmencie (centrum Warszawy).
 Uwaga: wymaga zainstalowanego osmnx i zależności systemowych. Użyj bbox_buffer małego (np. 0.02).
+
+`--repeat N` liczy trasę N razy w jednym procesie i wypisuje czas każdego przebiegu:
+graf jest pobierany tylko raz (cache w app.routing), kolejne przebiegi go używają.
 """
+import argparse
+import time
+
 from app.routing import compute_route
 
 # przykładowe bliskie punkty w Warszawie
@@ -8,10 +14,20 @@ start = (52.2296756, 21.0122287)  # Rynek/centrum
 end = (52.235, 21.01)  # kilka kilometrów na północ
 params = {"prefer_main_roads": 0.3, "prefer_unpaved": 0.2, "heatmap_influence": 0.0, "prefer_streetview": 0.0}
 
+
+def parse_args():
+    p = argparse.ArgumentParser(description='Run the local PoC route')
+    p.add_argument('--repeat', type=int, default=1, help='number of routes computed in this process')
+    return p.parse_args()
+
+
 if __name__ == '__main__':
+    args = parse_args()
     try:
-        coords, gpx = compute_route(start, end, params, bbox_buffer=0.02)
-        print(f"Got {len(coords)} points in route")
+        for i in range(max(1, args.repeat)):
+            t0 = time.perf_counter()
+            coords, gpx = compute_route(start, end, params, bbox_buffer=0.02)
+            print(f"Run {i + 1}: got {len(coords)} points in route in {time.perf_counter() - t0:.2f}s")
         # zapisz GPX do pliku
         with open('poc_route.gpx', 'w', encoding='utf-8') as f:
             f.write(gpx)
@@ -9,112 +9,99 @@ Usage:
       --segment-km 20 --radius 8000 --out poc_route_segmented.gpx
 
 Notes:
-- The script linearly interpolates lat/lon points between start and end to create
-  segment endpoints. For long distances you may prefer great-circle interpolation.
+- Segment endpoints are spaced evenly along the great circle between start and end.
+- Segments are routed concurrently (--workers, default 2).
+- --prefetch downloads a single bbox graph around the whole trip and routes every
+  segment on it. It trades a larger download for a single fetch: the bbox of a
+  diagonal trip covers far more area than the per-segment circles (about 7x for
+  Warsaw -> Bialystok).
 - If a segment fails to find a path, the script will attempt to retry with a
-  larger radius (up to 3x) before failing.
+  larger radius (up to 3x, with exponential backoff) before failing; with
+  --prefetch it retries on the same bbox.
 """
 import argparse
 import math
 import time
-from typing import List, Tuple
-
-from app.routing import compute_route
-
-
-def haversine_km(a: Tuple[float, float], b: Tuple[float, float]) -> float:
-    lat1, lon1 = math.radians(a[0]), math.radians(a[1])
-    lat2, lon2 = math.radians(b[0]), math.radians(b[1])
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-    R = 6371.0
-    h = math.sin(dlat/2)**2 + math.cos(lat1)*math.cos(lat2)*math.sin(dlon/2)**2
-    return 2*R*math.asin(math.sqrt(h))
-
-
-def interp_points(a: Tuple[float, float], b: Tuple[float, float], n: int) -> List[Tuple[float, float]]:
-    # simple linear interpolation in lat/lon
-    points = []
-    for i in range(n+1):
-        t = i / n
-        lat = a[0] + (b[0]-a[0])*t
-        lon = a[1] + (b[1]-a[1])*t
-        points.append((lat, lon))
-    return points
-
-
-def stitch_coords(all_coords: List[List[Tuple[float, float]]]) -> List[Tuple[float, float]]:
-    if not all_coords:
-        return []
-    stitched = list(all_coords[0])
-    for seg in all_coords[1:]:
-        if not seg:
-            continue
-        # avoid duplicate near-boundary points: drop leading points from seg until different
-        i = 0
-        while i < len(seg) and seg[i] == stitched[-1]:
-            i += 1
-        stitched.extend(seg[i:])
-    return stitched
-
-
-def run_segmented(start, end, params, segment_km=20, radius_m=8000, out='poc_route_segmented.gpx'):
+from concurrent.futures import ThreadPoolExecutor
+from app.geoutils import haversine_km, interp_points, stitch_coords
+from app.routing import compute_route, write_gpx
+
+
+def route_segment(i, n_segments, s, e, params, radius_m, retries=3, bbox=None):
+    """Route one segment, retrying with a 1.5x larger radius and exponential backoff.
+
+    With ``bbox`` every segment is routed on that one shared graph instead; the radius
+    is ignored then, so retries only back off and route on the same bbox again.
+    """
+    cur_radius = radius_m
+    area = f'bbox={bbox}' if bbox is not None else f'radius={cur_radius}'
+    for attempt in range(1, retries + 1):
+        try:
+            print(f'Computing segment {i+1}/{n_segments}, start={s}, end={e}, {area}')
+            return compute_route(s, e, params, radius_meters=cur_radius, bbox=bbox)
+        except Exception as exc:
+            if attempt == retries:
+                raise RuntimeError(f'Failed to compute segment {i+1} after retries') from exc
+            delay = 2 ** attempt
+            if bbox is None:
+                cur_radius = int(cur_radius * 1.5)
+                area = f'radius={cur_radius}'
+                print(f'  segment {i+1} failed (attempt {attempt}): {exc}. retrying with radius {cur_radius} in {delay}s')
+            else:
+                print(f'  segment {i+1} failed (attempt {attempt}): {exc}. retrying on the same bbox in {delay}s')
+            time.sleep(delay)
+
+
+def run_segmented(start, end, params, segment_km=20, radius_m=8000, out='poc_route_segmented.gpx', workers=2, prefetch_buffer=None):
     dist_km = haversine_km(start, end)
     n_segments = max(1, math.ceil(dist_km / segment_km))
     print(f'distance ~{dist_km:.1f} km, splitting into {n_segments} segments')
 
     points = interp_points(start, end, n_segments)
-    all_coords = []
-    all_gpx_parts = []
-
-    for i in range(n_segments):
-        s = points[i]
-        e = points[i+1]
-        attempt = 0
-        success = False
-        cur_radius = radius_m
-        while attempt < 3 and not success:
-            try:
-                print(f'Computing segment {i+1}/{n_segments}, start={s}, end={e}, radius={cur_radius}')
-                coords, gpx = compute_route(s, e, params, radius_meters=cur_radius)
-                all_coords.append(coords)
-                all_gpx_parts.append(gpx)
-                success = True
-            except Exception as exc:
-                attempt += 1
-                cur_radius = int(cur_radius * 1.5)
-                print(f'  segment failed (attempt {attempt}): {exc}. retrying with radius {cur_radius} in 2s')
-                time.sleep(2)
-        if not success:
-            raise RuntimeError(f'Failed to compute segment {i+1} after retries')
-        # small pause to be nice to Overpass
-        time.sleep(1)
 
-    stitched = stitch_coords(all_coords)
+    # With prefetch, one bbox around all segment endpoints is downloaded once and every
+    # segment is routed on it, instead of one download per segment. The bbox covers more
+    # area than the segment circles, so this saves requests, not data.
+    bbox = None
+    if prefetch_buffer is not None:
+        lats = [p[0] for p in points]
+        lons = [p[1] for p in points]
+        bbox = (max(lats) + prefetch_buffer, min(lats) - prefetch_buffer,
+                max(lons) + prefetch_buffer, min(lons) - prefetch_buffer)
+        print(f'prefetching one graph for bbox {bbox}')
+
+    # Segments are independent and mostly wait on Overpass, so route a few at a time;
+    # the small pool keeps the load on the public Overpass instance polite.
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        results = list(pool.map(
+            lambda i: route_segment(i, n_segments, points[i], points[i+1], params, radius_m, bbox=bbox),
+            range(n_segments),
+        ))
+    all_coords = [coords for coords, _ in results]
 
-    # generate simple GPX from stitched coords
-    try:
-        import gpxpy
-        import gpxpy.gpx
-        gpx = gpxpy.gpx.GPX()
-        track = gpxpy.gpx.GPXTrack()
-        gpx.tracks.append(track)
-        seg = gpxpy.gpx.GPXTrackSegment()
-        track.segments.append(seg)
-        for lat, lon in stitched:
-            seg.points.append(gpxpy.gpx.GPXTrackPoint(lat, lon))
-        gpx_str = gpx.to_xml()
-    except Exception:
-        # fallback: use concatenation of first segment GPX
-        gpx_str = all_gpx_parts[0]
+    stitched = stitch_coords(all_coords)
 
+    # stream the stitched track straight to the file
     with open(out, 'w', encoding='utf-8') as f:
-        f.write(gpx_str)
+        write_gpx(f, stitched)
 
     print(f'Wrote {out}, total points={len(stitched)}')
     return stitched, out
 
 
+def validate_gpx(path, expected_points):
+    """Parse the written file with gpxpy and check it holds one track with every point."""
+    import gpxpy
+
+    with open(path, encoding='utf-8') as f:
+        gpx = gpxpy.parse(f)
+    n_points = sum(len(seg.points) for trk in gpx.tracks for seg in trk.segments)
+    if len(gpx.tracks) != 1 or n_points != expected_points:
+        raise RuntimeError(f'{path}: expected 1 track with {expected_points} points, '
+                           f'got {len(gpx.tracks)} tracks with {n_points} points')
+    print(f'Validated {path} with gpxpy')
+
+
 def parse_args():
     p = argparse.ArgumentParser(description='Run segmented PoC route generation')
     p.add_argument('--start', type=float, nargs=2, required=True)
@@ -122,13 +109,23 @@ def parse_args():
     p.add_argument('--segment-km', type=float, default=20)
     p.add_argument('--radius', type=int, default=8000)
     p.add_argument('--out', type=str, default='poc_route_segmented.gpx')
+    p.add_argument('--workers', type=int, default=2, help='segments routed concurrently')
+    p.add_argument('--prefetch', action='store_true',
+                   help='download one bbox graph around the whole trip and route every segment on it '
+                        '(one fetch, but a larger area than the per-segment circles)')
+    p.add_argument('--prefetch-buffer', type=float, default=0.05, help='bbox buffer in degrees for --prefetch')
+    p.add_argument('--validate', action='store_true', help='re-read the written GPX with gpxpy and check it')
     return p.parse_args()
 
 
 def main():
     args = parse_args()
     params = {'prefer_main_roads': 0.5, 'prefer_unpaved': 0.2, 'heatmap_influence': 0.0, 'prefer_streetview': 0.0}
-    run_segmented(tuple(args.start), tuple(args.end), params, segment_km=args.segment_km, radius_m=args.radius, out=args.out)
+    stitched, out = run_segmented(tuple(args.start), tuple(args.end), params, segment_km=args.segment_km, radius_m=args.radius,
+                                  out=args.out, workers=args.workers,
+                                  prefetch_buffer=args.prefetch_buffer if args.prefetch else None)
+    if args.validate:
+        validate_gpx(out, len(stitched))
 
 
 if __name__ == '__main__':
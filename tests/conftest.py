@@ -0,0 +1,13 @@
+import pytest
+
+from app import routing
+
+
+@pytest.fixture(autouse=True)
+def _clear_routing_caches():
+    """Start and leave every test with empty graph and route caches."""
+    routing._load_graph.cache_clear()
+    routing._route_path.cache_clear()
+    yield
+    routing._load_graph.cache_clear()
+    routing._route_path.cache_clear()
@@ -1,9 +1,13 @@
 import pytest
 import math
 import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Tuple
 
-from app.routing import compute_route_intersections, compute_route
+import numpy as np
+
+from app.geoutils import haversine_km, haversine_m, interp_points
+from app.routing import compute_route_intersections, compute_route, write_gpx
 
 
 @pytest.mark.integration
@@ -29,24 +33,13 @@ def test_generate_100km_and_write_artifact():
         'prefer_streetview': 0.0,
     }
 
-    # segmentation helpers (lightweight copy of the script logic)
-    def haversine_km(a: Tuple[float, float], b: Tuple[float, float]) -> float:
-        lat1, lon1 = math.radians(a[0]), math.radians(a[1])
-        lat2, lon2 = math.radians(b[0]), math.radians(b[1])
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
-        R = 6371.0
-        h = math.sin(dlat / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon / 2) ** 2
-        return 2 * R * math.asin(math.sqrt(h))
-
-    def interp_points(a: Tuple[float, float], b: Tuple[float, float], n: int) -> List[Tuple[float, float]]:
-        points = []
-        for i in range(n + 1):
-            t = i / n
-            lat = a[0] + (b[0] - a[0]) * t
-            lon = a[1] + (b[1] - a[1]) * t
-            points.append((lat, lon))
-        return points
+    def append_after(stitched: List[Tuple[float, float]], pts: List[Tuple[float, float]]) -> None:
+        # extend stitched with pts, skipping leading points equal to its current end
+        last = stitched[-1]
+        j = 0
+        while j < len(pts) and pts[j] == last:
+            j += 1
+        stitched.extend(pts[j:])
 
     def stitch_coords(all_coords: List[List[Tuple[float, float]]]) -> List[Tuple[float, float]]:
         if not all_coords:
@@ -55,24 +48,22 @@ def test_generate_100km_and_write_artifact():
         for seg in all_coords[1:]:
             if not seg:
                 continue
+            # stitched only changes at the extends below, so read its end point once
+            last = stitched[-1]
             # if consecutive segments align, skip duplicates
             i = 0
-            while i < len(seg) and seg[i] == stitched[-1]:
+            while i < len(seg) and seg[i] == last:
                 i += 1
 
-            # if there's a large gap between stitched[-1] and seg[i], try to fill it
-            def haversine_m(a, b):
-                from math import radians, sin, cos, atan2, sqrt
-                R = 6371000.0
-                lat1, lon1 = a
-                lat2, lon2 = b
-                phi1 = radians(lat1); phi2 = radians(lat2)
-                dphi = radians(lat2 - lat1); dlambda = radians(lon2 - lon1)
-                aa = sin(dphi/2)**2 + cos(phi1)*cos(phi2)*sin(dlambda/2)**2
-                return R * 2 * atan2(sqrt(aa), sqrt(1-aa))
-
+            # if there's a large gap between last and seg[i], try to fill it
+            if i < len(seg) and haversine_m(last, seg[i]) > 1000.0:
+                # the next segment often runs past the current end point further on; splice
+                # there (one vectorized nearest-point scan) instead of routing a bridge
+                near = np.flatnonzero(haversine_m(np.asarray(seg[i:], dtype=np.float64), last) <= 50.0)
+                if len(near):
+                    i += int(near[0]) + 1
             if i < len(seg):
-                gap = haversine_m(stitched[-1], seg[i])
+                gap = haversine_m(last, seg[i])
                 # if gap is unexpectedly large, attempt to compute a bridging route
                 if gap > 1000.0:
                     # try several radii to bridge the gap
@@ -81,9 +72,9 @@ def test_generate_100km_and_write_artifact():
                     attempts = 0
                     while attempts < 3 and bridged is None:
                         try:
-                            b_coords, _ = compute_route_intersections(stitched[-1], seg[i], params, radius_meters=cur_radius)
+                            b_coords, _ = compute_route_intersections(last, seg[i], params, radius_meters=cur_radius)
                             # ensure we have something reasonable
-                            if b_coords and haversine_m(b_coords[0], stitched[-1]) < gap and haversine_m(b_coords[-1], seg[i]) < gap:
+                            if b_coords and haversine_m(b_coords[0], last) < gap and haversine_m(b_coords[-1], seg[i]) < gap:
                                 bridged = b_coords
                                 break
                         except Exception:
@@ -91,21 +82,14 @@ def test_generate_100km_and_write_artifact():
                         attempts += 1
                         cur_radius = int(cur_radius * 1.5)
                     if bridged:
-                        # append bridged (skip duplicate start)
-                        j = 0
-                        while j < len(bridged) and bridged[j] == stitched[-1]:
-                            j += 1
-                        stitched.extend(bridged[j:])
-                        # now append the remainder of seg skipping duplicates
-                        k = 0
-                        while k < len(seg) and seg[k] == stitched[-1]:
-                            k += 1
-                        stitched.extend(seg[k:])
+                        # append bridged, then the remainder of seg (skipping duplicates)
+                        append_after(stitched, bridged)
+                        append_after(stitched, seg)
                         continue
                     # fallback: try splitting the gap into smaller subsegments
                     sub_len = 5000.0
                     n_sub = max(1, int(gap // sub_len) + 1)
-                    sub_points = interp_points(stitched[-1], seg[i], n_sub)
+                    sub_points = interp_points(last, seg[i], n_sub)
                     filled = True
                     for si in range(n_sub):
                         a = sub_points[si]
@@ -118,10 +102,7 @@ def test_generate_100km_and_write_artifact():
                                 c_coords, _ = compute_route_intersections(a, b, params, radius_meters=cur_radius2)
                                 if c_coords and len(c_coords) >= 2:
                                     # append segment (skip duplicate start)
-                                    m = 0
-                                    while m < len(c_coords) and c_coords[m] == stitched[-1]:
-                                        m += 1
-                                    stitched.extend(c_coords[m:])
+                                    append_after(stitched, c_coords)
                                     success2 = True
                                     break
                             except Exception:
@@ -133,10 +114,7 @@ def test_generate_100km_and_write_artifact():
                             break
                     if filled:
                         # finally append remainder of seg skipping duplicates
-                        k = 0
-                        while k < len(seg) and seg[k] == stitched[-1]:
-                            k += 1
-                        stitched.extend(seg[k:])
+                        append_after(stitched, seg)
                         continue
 
             stitched.extend(seg[i:])
@@ -146,71 +124,63 @@ def test_generate_100km_and_write_artifact():
     segment_km = 20.0
     n_segments = max(1, math.ceil(dist_km / segment_km))
     points = interp_points(start, end, n_segments)
-    all_coords = []
 
-    for i in range(n_segments):
-        s = points[i]
-        e = points[i + 1]
-        attempt = 0
-        success = False
+    def route_segment(i):
         cur_radius = 8000
-        while attempt < 3 and not success:
+        for attempt in range(3):
             try:
-                coords, gpx = compute_route_intersections(s, e, params, radius_meters=cur_radius)
-                all_coords.append(coords)
-                success = True
-            except Exception as exc:
-                attempt += 1
+                coords, _ = compute_route_intersections(points[i], points[i + 1], params, radius_meters=cur_radius)
+                return coords
+            except Exception:
                 cur_radius = int(cur_radius * 1.5)
-                time.sleep(1)
-        if not success:
+                time.sleep(2 ** attempt)
+        return None
+
+    # segments wait on Overpass independently; route a couple at a time
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        all_coords = list(pool.map(route_segment, range(n_segments)))
+    for i, coords in enumerate(all_coords):
+        if coords is None:
             pytest.skip(f"Segment {i+1} failed after retries")
 
     stitched = stitch_coords(all_coords)
 
-    # Post-process: repair large straight-line gaps by routing on the original graph
-    def haversine_m(a, b):
-        from math import radians, sin, cos, atan2, sqrt
-        R = 6371000.0
-        lat1, lon1 = a
-        lat2, lon2 = b
-        phi1 = radians(lat1); phi2 = radians(lat2)
-        dphi = radians(lat2 - lat1); dlambda = radians(lon2 - lon1)
-        aa = sin(dphi/2)**2 + cos(phi1)*cos(phi2)*sin(dlambda/2)**2
-        return R * 2 * atan2(sqrt(aa), sqrt(1-aa))
-
+    # Post-process: repair large straight-line gaps by routing on the original graph.
+    # All consecutive gaps come from one vectorized pass; only the large ones are visited.
     final_coords: List[Tuple[float, float]] = [stitched[0]] if stitched else []
-    for i in range(1, len(stitched)):
+    pts = np.asarray(stitched, dtype=np.float64).reshape(-1, 2)
+    gaps_m = haversine_m(pts[:-1], pts[1:])
+    done = 0
+    for i in (np.flatnonzero(gaps_m > 1000.0) + 1).tolist():
+        # points up to the start of the gap need no repair
+        final_coords.extend(stitched[done + 1:i])
+        done = i
         a = stitched[i - 1]
         b = stitched[i]
-        gap = haversine_m(a, b)
-        if gap > 1000.0:
-            # try several bbox buffers (degrees) to reconstruct the path on original graph
-            buf = 0.05
-            bridged = None
-            attempts = 0
-            while attempts < 4 and bridged is None:
-                try:
-                    coords_seg, _ = compute_route(a, b, params, bbox_buffer=buf)
-                    if coords_seg and len(coords_seg) >= 2:
-                        bridged = coords_seg
-                        break
-                except Exception:
-                    pass
-                attempts += 1
-                buf *= 2
-            if bridged:
-                # append bridged but remove duplicate start
-                j = 0
-                while j < len(bridged) and bridged[j] == final_coords[-1]:
-                    j += 1
-                final_coords.extend(bridged[j:])
-                continue
-            else:
-                # fallback to straight append
-                final_coords.append(b)
+        # try several bbox buffers (degrees) to reconstruct the path on original graph
+        buf = 0.05
+        bridged = None
+        attempts = 0
+        while attempts < 4 and bridged is None:
+            try:
+                coords_seg, _ = compute_route(a, b, params, bbox_buffer=buf)
+                if coords_seg and len(coords_seg) >= 2:
+                    bridged = coords_seg
+                    break
+            except Exception:
+                pass
+            attempts += 1
+            buf *= 2
+        if bridged:
+            # append bridged but remove duplicate start
+            j = 0
+            while j < len(bridged) and bridged[j] == final_coords[-1]:
+                j += 1
+            final_coords.extend(bridged[j:])
         else:
+            # fallback to straight append
             final_coords.append(b)
+    final_coords.extend(stitched[done + 1:])
 
     stitched = final_coords
 
@@ -223,22 +193,7 @@ def test_generate_100km_and_write_artifact():
     os.makedirs('artifacts', exist_ok=True)
     out_path = os.path.join('artifacts', 'poc_route_100km_intersections.gpx')
 
-    try:
-        import gpxpy
-        import gpxpy.gpx
-        gpx = gpxpy.gpx.GPX()
-        track = gpxpy.gpx.GPXTrack()
-        gpx.tracks.append(track)
-        seg = gpxpy.gpx.GPXTrackSegment()
-        track.segments.append(seg)
-        for lat, lon in stitched:
-            seg.points.append(gpxpy.gpx.GPXTrackPoint(lat, lon))
-        with open(out_path, 'w', encoding='utf-8') as f:
-            f.write(gpx.to_xml())
-    except Exception:
-        # fallback: write a simple CSV of lat,lon
-        with open(out_path + '.csv', 'w', encoding='utf-8') as f:
-            for lat, lon in stitched:
-                f.write(f"{lat},{lon}\n")
-
-    assert os.path.exists(out_path) or os.path.exists(out_path + '.csv')
+    with open(out_path, 'w', encoding='utf-8') as f:
+        write_gpx(f, stitched)
+
+    assert os.path.exists(out_path)
@@ -0,0 +1,39 @@
+import math
+
+import pytest
+
+from app.geoutils import EARTH_RADIUS_M, haversine_km, haversine_m, interp_points, stitch_coords
+from app.routing import _haversine, _haversine_many
+
+
+def test_haversine_matches_known_arcs_for_scalars_and_arrays():
+    a = [(0.0, 0.0), (0.0, 0.0), (52.2297, 21.0122), (89.0, 10.0)]
+    b = [(1.0, 0.0), (0.0, 180.0), (52.2297, 21.0122), (89.0, -170.0)]
+    expected = [EARTH_RADIUS_M * math.radians(1), EARTH_RADIUS_M * math.pi, 0.0, EARTH_RADIUS_M * math.radians(2)]
+
+    assert haversine_m(a[0], b[0]) == pytest.approx(expected[0])
+    assert isinstance(haversine_km(a[0], b[0]), float)
+    assert haversine_m(a, b).tolist() == pytest.approx(expected)
+    # app.routing wraps the same implementation
+    assert [_haversine(p, q) for p, q in zip(a, b)] == pytest.approx(expected)
+    lat1, lon1 = zip(*a)
+    lat2, lon2 = zip(*b)
+    assert _haversine_many(lat1, lon1, lat2, lon2).tolist() == pytest.approx(expected)
+
+
+def test_interp_points_are_evenly_spaced_on_the_great_circle():
+    start, end = (52.2297, 21.0122), (53.1325, 23.1688)
+
+    points = interp_points(start, end, 4)
+
+    assert points[0] == start and points[-1] == end
+    steps = haversine_km(points[:-1], points[1:])
+    assert steps.tolist() == pytest.approx([haversine_km(start, end) / 4] * 4)
+    assert all(p == pytest.approx(start) for p in interp_points(start, start, 2))
+
+
+def test_stitch_coords_drops_shared_segment_endpoints():
+    segments = [[(1.0, 2.0), (3.0, 4.0)], [], [(3.0, 4.0), (5.0, 6.0)], [(5.0, 6.0), (7.0, 8.0)]]
+
+    assert stitch_coords(segments) == [(1.0, 2.0), (3.0, 4.0), (5.0, 6.0), (7.0, 8.0)]
+    assert stitch_coords([]) == []
@@ -11,43 +11,10 @@ import math
 import time
 from typing import List, Tuple
 
-from app.routing import compute_route_intersections, compute_route
-
-
-def haversine_m(a: Tuple[float, float], b: Tuple[float, float]) -> float:
-    """Calculate distance in meters between two (lat, lon) points."""
-    from math import radians, sin, cos, atan2, sqrt
-    R = 6371000.0
-    lat1, lon1 = a
-    lat2, lon2 = b
-    phi1 = radians(lat1)
-    phi2 = radians(lat2)
-    dphi = radians(lat2 - lat1)
-    dlambda = radians(lon2 - lon1)
-    aa = sin(dphi / 2) ** 2 + cos(phi1) * cos(phi2) * sin(dlambda / 2) ** 2
-    return R * 2 * atan2(sqrt(aa), sqrt(1 - aa))
-
+import numpy as np
 
-def haversine_km(a: Tuple[float, float], b: Tuple[float, float]) -> float:
-    """Calculate distance in km between two (lat, lon) points."""
-    lat1, lon1 = math.radians(a[0]), math.radians(a[1])
-    lat2, lon2 = math.radians(b[0]), math.radians(b[1])
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-    R = 6371.0
-    h = math.sin(dlat / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon / 2) ** 2
-    return 2 * R * math.asin(math.sqrt(h))
-
-
-def interp_points(a: Tuple[float, float], b: Tuple[float, float], n: int) -> List[Tuple[float, float]]:
-    """Interpolate n+1 points between a and b."""
-    points = []
-    for i in range(n + 1):
-        t = i / n
-        lat = a[0] + (b[0] - a[0]) * t
-        lon = a[1] + (b[1] - a[1]) * t
-        points.append((lat, lon))
-    return points
+from app.geoutils import haversine_km, haversine_m, interp_points
+from app.routing import compute_route_intersections, compute_route
 
 
 def check_route_gaps(coords: List[Tuple[float, float]], max_gap_m: float = 1000.0) -> Tuple[bool, List[float]]:
@@ -57,10 +24,9 @@ def check_route_gaps(coords: List[Tuple[float, float]], max_gap_m: float = 1000.
     Returns:
         (has_large_gaps, list_of_gaps_in_meters)
     """
-    gaps = []
-    for i in range(1, len(coords)):
-        gap = haversine_m(coords[i - 1], coords[i])
-        gaps.append(gap)
+    # one vectorized pass: stitched long routes have tens of thousands of points
+    pts = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    gaps = haversine_m(pts[:-1], pts[1:]).tolist()
     
     large_gaps = [g for g in gaps if g > max_gap_m]
     return len(large_gaps) > 0, large_gaps
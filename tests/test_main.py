@@ -0,0 +1,55 @@
+from fastapi.testclient import TestClient
+
+from app import main
+
+
+def test_route_endpoint_returns_coords_and_gpx(monkeypatch):
+    calls = []
+
+    def fake_compute_route(start, end, params):
+        calls.append((start, end, params))
+        return [start, end], '<?xml version="1.0"?><gpx/>'
+
+    monkeypatch.setattr(main, 'compute_route', fake_compute_route)
+    client = TestClient(main.app)
+
+    resp = client.post('/route', json={'start': [52.2297, 21.0122], 'end': [52.235, 21.01]})
+
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body['coords'] == [[52.2297, 21.0122], [52.235, 21.01]]
+    assert body['gpx'].startswith('<?xml')
+    assert calls[0][2]['prefer_main_roads'] == 0.5
+
+
+def test_cors_allows_configured_origin(monkeypatch):
+    import importlib
+
+    monkeypatch.setenv('ALLOWED_ORIGINS', 'https://a.example, https://b.example')
+    mod = importlib.reload(main)
+    try:
+        client = TestClient(mod.app)
+        ok = client.get('/health', headers={'Origin': 'https://b.example'})
+        assert ok.headers.get('access-control-allow-origin') == 'https://b.example'
+        denied = client.get('/health', headers={'Origin': 'https://evil.example'})
+        assert 'access-control-allow-origin' not in denied.headers
+    finally:
+        monkeypatch.delenv('ALLOWED_ORIGINS')
+        importlib.reload(main)
+
+
+def test_index_served_from_memory_with_etag(monkeypatch):
+    monkeypatch.setattr(main, '_INDEX_BYTES', b'<html>jadlo</html>')
+    monkeypatch.setattr(main, '_INDEX_ETAG', '"abc"')
+    client = TestClient(main.app)
+
+    resp = client.get('/')
+    assert resp.status_code == 200
+    assert resp.content == b'<html>jadlo</html>'
+    assert resp.headers['etag'] == '"abc"'
+
+    cached = client.get('/', headers={'If-None-Match': '"abc"'})
+    assert cached.status_code == 304
+    for header in ('W/"abc"', '"old", "abc"', '"old",W/"abc"', '*'):
+        assert client.get('/', headers={'If-None-Match': header}).status_code == 304
+    assert client.get('/', headers={'If-None-Match': '"old", "abcd"'}).status_code == 200
@@ -1,7 +1,25 @@
 import sys
+import pytest
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from app.routing import _edge_penalty
+import networkx as nx
+import numpy as np
+from app import routing
+from app.routing import (
+    _coords_to_gpx,
+    _edge_penalty,
+    _edge_columns,
+    _edge_weights,
+    _ensure_edge_lengths,
+    _bearing,
+    _bearing_many,
+    _haversine,
+    _nearest_intersection,
+    _node_coords,
+    _shortest_path_csr,
+    compute_route_intersections,
+    simplify_graph_to_intersections,
+)
 
 
 def test_edge_penalty_default():
@@ -29,3 +47,494 @@ def test_prefer_main_roads_effect():
     w_avoid = _edge_penalty(1, 2, 0, data_main, params_avoid)
     w_prefer = _edge_penalty(1, 2, 0, data_main, params_prefer)
     assert w_prefer < w_avoid
+
+
+def test_vectorized_edge_weights_match_scalar_penalty():
+    G = nx.MultiDiGraph()
+    edges = [
+        {'length': 100.0, 'highway': 'residential', 'surface': 'asphalt'},
+        {'length': 250.0, 'highway': 'primary', 'surface': 'asphalt:lanes'},
+        {'length': 80.0, 'highway': ['cycleway', 'path'], 'surface': 'gravel'},
+        {'length': 40.0, 'highway': 'track', 'surface': 'dirt'},
+        {'length': 60.0, 'highway': 'motorway'},
+        {'length': 10.0},
+    ]
+    for i, data in enumerate(edges):
+        G.add_edge(i, i + 1, **data)
+    params = {'prefer_main_roads': 0.8, 'prefer_unpaved': 0.1, 'heatmap_influence': 0.6, 'surface_weight_factor': 1.7}
+
+    weights = _edge_weights(_edge_columns(G), params)
+
+    expected = [_edge_penalty(u, v, k, d, params) for u, v, k, d in G.edges(keys=True, data=True)]
+    assert weights.tolist() == pytest.approx(expected)
+
+
+def test_ensure_edge_lengths_fallback_uses_haversine():
+    G = nx.MultiDiGraph()
+    G.add_node(1, y=52.0, x=21.0)
+    G.add_node(2, y=52.01, x=21.02)
+    G.add_node(3)  # no coordinates
+    G.add_edge(1, 2)
+    G.add_edge(2, 1, length=5.0)
+    G.add_edge(2, 3)
+
+    G = _ensure_edge_lengths(G)
+
+    assert G[1][2][0]['length'] == pytest.approx(_haversine((52.0, 21.0), (52.01, 21.02)))
+    assert G[2][1][0]['length'] == 5.0
+    assert G[2][3][0]['length'] == 1.0
+
+
+def test_ensure_edge_lengths_skips_complete_graphs(monkeypatch):
+    def fail():
+        raise AssertionError('lengths were recomputed')
+
+    monkeypatch.setattr(routing, '_ox_add_edge_lengths', fail)
+    G = _chain_graph()
+
+    assert _ensure_edge_lengths(G) is G
+    assert G[0][1][0]['length'] == 100.0
+
+
+def test_importing_routing_does_not_import_osmnx():
+    import subprocess
+
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    code = "import sys, app.routing; assert 'osmnx' not in sys.modules"
+    subprocess.run([sys.executable, '-c', code], cwd=root, check=True)
+
+
+def _chain_graph():
+    """Two-way street 0-1-2-3 with a junction at 3 branching to dead ends 4 and 5."""
+    G = nx.MultiDiGraph()
+    coords = {0: (52.00, 21.00), 1: (52.00, 21.01), 2: (52.00, 21.02), 3: (52.00, 21.03), 4: (52.01, 21.03), 5: (51.99, 21.03)}
+    for n, (y, x) in coords.items():
+        G.add_node(n, y=y, x=x)
+    for u, v, length in [(0, 1, 100.0), (1, 2, 110.0), (2, 3, 120.0), (3, 4, 50.0), (3, 5, 60.0)]:
+        G.add_edge(u, v, length=length, highway='residential', surface='asphalt')
+        G.add_edge(v, u, length=length, highway='residential', surface='asphalt')
+    return G
+
+
+def test_simplify_graph_collapses_degree_two_chains():
+    G = _chain_graph()
+    for _, _, data in G.edges(data=True):
+        data['weight'] = 2 * data['length']
+
+    H = simplify_graph_to_intersections(G)
+
+    assert set(H.nodes) == {0, 3, 4, 5}
+    assert set(H.edges) == {(0, 3), (3, 0), (3, 4), (4, 3), (3, 5), (5, 3)}
+    assert H[0][3]['length'] == pytest.approx(330.0)
+    assert H[0][3]['weight'] == pytest.approx(660.0)
+    assert H[0][3]['geometry'] == [(52.00, 21.00), (52.00, 21.01), (52.00, 21.02), (52.00, 21.03)]
+
+
+def test_simplify_graph_uses_cheapest_parallel_edge():
+    G = _chain_graph()
+    G.add_edge(3, 4, length=400.0)  # longer parallel edge, e.g. a separate carriageway
+    G.add_edge(3, 4, length=40.0)
+    weights = np.array([d['length'] for _, _, d in G.edges(data=True)])
+
+    H_weighted = simplify_graph_to_intersections(G, weights=weights)
+    H_attrs = simplify_graph_to_intersections(G)
+
+    assert H_weighted[3][4]['weight'] == pytest.approx(40.0)
+    assert H_attrs[3][4]['length'] == pytest.approx(40.0)
+
+
+def test_undirected_adjacency_counts_distinct_neighbors():
+    G = _chain_graph()
+    G.add_edge(1, 2, length=90.0)  # parallel edge inside the chain
+    G.add_edge(4, 4, length=5.0)   # self-loop at a dead end
+
+    uadj = routing._undirected_adjacency(G)
+
+    assert list(uadj[1]) == [0, 2]
+    assert list(uadj[3]) == [2, 4, 5]
+    assert list(uadj[4]) == [3]
+    assert not routing._is_intersection_node(G, 1, uadj)
+    assert set(simplify_graph_to_intersections(G, uadj).nodes) == {0, 3, 4, 5}
+
+
+def test_shortest_path_csr_matches_networkx_dijkstra():
+    G = nx.MultiDiGraph()
+    G.add_edge('a', 'b', weight=5.0)
+    G.add_edge('a', 'b', weight=1.0)  # cheaper parallel edge must win
+    G.add_edge('b', 'd', weight=1.0)
+    G.add_edge('a', 'c', weight=1.5)
+    G.add_edge('c', 'd', weight=1.0)
+    G.add_edge('d', 'e', weight=0.0)
+    G.add_node('island')
+    weights = np.array([d['weight'] for _, _, d in G.edges(data=True)])
+
+    path = _shortest_path_csr(G, weights, 'a', 'e')
+
+    assert path == nx.shortest_path(G, 'a', 'e', weight='weight') == ['a', 'b', 'd', 'e']
+    with pytest.raises(nx.NetworkXNoPath):
+        _shortest_path_csr(G, weights, 'a', 'island')
+
+
+def test_bearing_many_matches_scalar_bearing():
+    starts = [(52.0, 21.0), (52.0, 21.0), (52.2, 21.1), (-33.9, 151.2)]
+    ends = [(52.1, 21.0), (51.9, 20.9), (52.2, 21.0), (-33.8, 151.3)]
+    lat1, lon1 = np.array(starts).T
+    lat2, lon2 = np.array(ends).T
+
+    got = _bearing_many(lat1, lon1, lat2, lon2)
+
+    assert got.tolist() == pytest.approx([_bearing(a, b) for a, b in zip(starts, ends)])
+
+
+def _nearest_node_brute_force(G, x, y):
+    return min(G.nodes, key=lambda n: _haversine((G.nodes[n]['y'], G.nodes[n]['x']), (y, x)))
+
+
+def test_compute_route_intersections_follows_chain_geometry(monkeypatch):
+    monkeypatch.setattr(routing, 'GRAPH_CACHE_DIR', '')
+    monkeypatch.setattr(routing.ox, 'graph_from_point', lambda *a, **kw: _chain_graph())
+    params = {'prefer_main_roads': 0.5, 'prefer_unpaved': 0.5, 'heatmap_influence': 0.0}
+
+    coords, gpx = compute_route_intersections((52.00, 21.00), (52.01, 21.03), params, radius_meters=1000)
+
+    assert coords == [(52.00, 21.00), (52.00, 21.01), (52.00, 21.02), (52.00, 21.03), (52.01, 21.03)]
+    assert gpx.startswith('<?xml')
+
+
+def test_compute_route_reuses_cached_graph(monkeypatch):
+    monkeypatch.setattr(routing, 'GRAPH_CACHE_DIR', '')
+    downloads = []
+
+    def fake_graph_from_point(*args, **kwargs):
+        downloads.append(args)
+        return _chain_graph()
+
+    monkeypatch.setattr(routing.ox, 'graph_from_point', fake_graph_from_point)
+    params = {'prefer_main_roads': 0.5, 'prefer_unpaved': 0.5, 'heatmap_influence': 0.0}
+
+    first, _ = routing.compute_route((52.00, 21.00), (52.01, 21.03), params, radius_meters=1000)
+    # a nearby start snaps to the same cached area; the cached graph must not be modified
+    second, _ = routing.compute_route((52.0001, 21.0001), (52.01, 21.03), params, radius_meters=1000)
+
+    assert len(downloads) == 1
+    assert first == second == [(52.00, 21.00), (52.00, 21.01), (52.00, 21.02), (52.00, 21.03), (52.01, 21.03)]
+    query = routing._graph_query((52.00, 21.00), (52.01, 21.03), radius_meters=1000)
+    assert all('weight' not in d for _, _, d in routing._load_graph(query).edges(data=True))
+
+
+def test_point_queries_snap_nearby_centers_and_keep_coverage():
+    a = routing._graph_query((52.2297, 21.0122), (0, 0), radius_meters=8000)
+    b = routing._graph_query((52.2311, 21.0111), (0, 0), radius_meters=8000)
+    assert a == b
+
+    for lat, lon in [(52.2297, 21.0122), (52.2324, 21.0149), (-33.8651, 151.2024)]:
+        _, clat, clon, dist = routing._graph_query((lat, lon), (0, 0), radius_meters=8000)
+        # graph_from_point's default 'bbox' extent: a square of half-side dist around the center
+        assert _haversine((clat, clon), (lat, clon)) + 8000 <= dist
+        assert _haversine((clat, clon), (clat, lon)) + 8000 <= dist
+
+
+def test_compute_route_legs_share_one_graph_for_explicit_bbox(monkeypatch):
+    monkeypatch.setattr(routing, 'GRAPH_CACHE_DIR', '')
+    downloads = []
+
+    def fake_graph_from_bbox(*args, **kwargs):
+        downloads.append(args)
+        return _chain_graph()
+
+    monkeypatch.setattr(routing, 'FETCH_WORKERS', 1)
+    monkeypatch.setattr(routing.ox, 'graph_from_bbox', fake_graph_from_bbox)
+    params = {'prefer_main_roads': 0.5, 'prefer_unpaved': 0.5, 'heatmap_influence': 0.0}
+    bbox = (52.05, 51.95, 21.05, 20.95)
+
+    first, _ = routing.compute_route((52.00, 21.00), (52.00, 21.02), params, bbox=bbox)
+    second, _ = routing.compute_route((52.00, 21.02), (52.01, 21.03), params, radius_meters=1000, bbox=bbox)
+
+    assert downloads == [(52.05, 51.95, 21.05, 20.95)]
+    assert first[-1] == second[0] == (52.00, 21.02)
+
+
+def test_compute_route_memoizes_paths_per_preferences(monkeypatch):
+    monkeypatch.setattr(routing, 'GRAPH_CACHE_DIR', '')
+    monkeypatch.setattr(routing.ox, 'graph_from_point', lambda *a, **kw: _chain_graph())
+    searches = []
+    real_shortest_path = routing._shortest_path_idx
+
+    def counting_shortest_path(*args):
+        searches.append(args[2:])
+        return real_shortest_path(*args)
+
+    monkeypatch.setattr(routing, '_shortest_path_idx', counting_shortest_path)
+    params = {'prefer_main_roads': 0.5, 'prefer_unpaved': 0.5, 'heatmap_influence': 0.0}
+
+    routing.compute_route((52.00, 21.00), (52.01, 21.03), params, radius_meters=1000)
+    routing.compute_route((52.00, 21.00), (52.01, 21.03), dict(params), radius_meters=1000)
+    routing.compute_route((52.00, 21.00), (52.01, 21.03), {**params, 'prefer_unpaved': 1.0}, radius_meters=1000)
+
+    assert searches == [(0, 4), (0, 4)]
+
+
+def test_memoized_path_is_not_reused_on_reloaded_graph_with_other_node_order(monkeypatch):
+    monkeypatch.setattr(routing, 'GRAPH_CACHE_DIR', '')
+    monkeypatch.setattr(routing.ox, 'graph_from_point', lambda *a, **kw: _chain_graph())
+    params = {'prefer_main_roads': 0.5, 'prefer_unpaved': 0.5, 'heatmap_influence': 0.0}
+    expected = [(52.00, 21.00), (52.00, 21.01), (52.00, 21.02), (52.00, 21.03), (52.01, 21.03)]
+    assert routing.compute_route((52.00, 21.00), (52.01, 21.03), params, radius_meters=1000)[0] == expected
+
+    def reversed_chain_graph(*args, **kwargs):
+        G = _chain_graph()
+        H = nx.MultiDiGraph()
+        H.add_nodes_from(reversed(list(G.nodes(data=True))))
+        H.add_edges_from(G.edges(data=True))
+        return H
+
+    # evict the graph only; the memoized path (node indices) stays in _route_path
+    routing._load_graph.cache_clear()
+    monkeypatch.setattr(routing.ox, 'graph_from_point', reversed_chain_graph)
+
+    assert routing.compute_route((52.00, 21.00), (52.01, 21.03), params, radius_meters=1000)[0] == expected
+
+
+def test_load_graph_reads_pickled_graph_from_disk(monkeypatch, tmp_path):
+    monkeypatch.setattr(routing, 'GRAPH_CACHE_DIR', str(tmp_path))
+    downloads = []
+
+    def fake_graph_from_point(*args, **kwargs):
+        downloads.append(args)
+        return _chain_graph()
+
+    monkeypatch.setattr(routing.ox, 'graph_from_point', fake_graph_from_point)
+    query = ('point', 52.0, 21.0, 1000.0)
+
+    built = routing._load_graph(query)
+    routing._load_graph.cache_clear()  # simulate a fresh worker process
+    loaded = routing._load_graph(query)
+
+    assert len(downloads) == 1
+    assert [p.name for p in tmp_path.iterdir()] == [os.path.basename(routing._graph_cache_path(query))]
+    assert routing._graph_cache_path(query).endswith('.zst' if routing.zstandard else '.pkl')
+    assert loaded is not built
+    assert sorted(loaded.edges(data='length')) == sorted(built.edges(data='length'))
+
+
+def test_edge_columns_are_built_once_per_graph(monkeypatch):
+    monkeypatch.setattr(routing, 'GRAPH_CACHE_DIR', '')
+    monkeypatch.setattr(routing.ox, 'graph_from_point', lambda *a, **k: _chain_graph())
+    G = routing._load_graph(('point', 52.0, 21.0, 1000.0))
+    cols = G.graph['_jadlo_edge_columns']
+
+    def fail(G):
+        raise AssertionError('edge attributes re-read')
+
+    monkeypatch.setattr(routing, '_read_edge_columns', fail)
+    assert _edge_columns(G) is cols
+    w1 = _edge_weights(_edge_columns(G), {'prefer_main_roads': 0.0})
+    w2 = _edge_weights(_edge_columns(G), {'prefer_main_roads': 1.0})
+    assert w1.shape == w2.shape == (G.number_of_edges(),)
+
+
+def test_graph_cache_evicts_least_recently_used_files(monkeypatch, tmp_path):
+    monkeypatch.setattr(routing, 'GRAPH_CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(routing, 'GRAPH_CACHE_MAX_MB', 1.5 * routing._PICKLE_BUFFER_SIZE / 2**20)
+    payload = nx.MultiDiGraph(blob=os.urandom(routing._PICKLE_BUFFER_SIZE // 2))
+    paths = [routing._graph_cache_path(('point', 52.0, 21.0 + i, 1000.0)) for i in range(3)]
+
+    routing._write_cached_graph(paths[0], payload)
+    routing._write_cached_graph(paths[1], payload)
+    os.utime(paths[0], (1, 1))
+    os.utime(paths[1], (2, 2))
+    assert routing._read_cached_graph(paths[0]) is not None  # now the most recently used
+    routing._write_cached_graph(paths[2], payload)
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(os.path.basename(p) for p in (paths[0], paths[2]))
+
+
+def test_graph_cache_pruning_tolerates_files_removed_by_other_workers(monkeypatch, tmp_path):
+    monkeypatch.setattr(routing, 'GRAPH_CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(routing, 'GRAPH_CACHE_MAX_MB', 0)
+    paths = [routing._graph_cache_path(('point', 52.0, 21.0 + i, 1000.0)) for i in range(3)]
+    for path in paths:
+        routing._write_cached_graph(path, nx.MultiDiGraph())
+    os.remove(paths[2])  # e.g. evicted by another worker right after it was written
+    os.utime(paths[0], (1, 1))
+    os.utime(paths[1], (2, 2))
+    monkeypatch.setattr(routing, 'GRAPH_CACHE_MAX_MB', 1e-6)
+
+    routing._prune_graph_cache(paths[2])
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_load_graph_reads_uncompressed_cache_without_zstandard(monkeypatch, tmp_path):
+    monkeypatch.setattr(routing, 'GRAPH_CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(routing, 'zstandard', None)
+    monkeypatch.setattr(routing.ox, 'graph_from_point', lambda *a, **kw: _chain_graph())
+    query = ('point', 52.0, 21.0, 1000.0)
+
+    routing._load_graph(query)
+    routing._load_graph.cache_clear()
+    monkeypatch.setattr(routing.ox, 'graph_from_point', lambda *a, **kw: pytest.fail('graph was downloaded again'))
+    loaded = routing._load_graph(query)
+
+    assert routing._graph_cache_path(query).endswith('.pkl')
+    assert len(loaded.edges) == len(_chain_graph().edges)
+
+
+def test_concurrent_requests_for_one_area_download_once(monkeypatch):
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    monkeypatch.setattr(routing, 'GRAPH_CACHE_DIR', '')
+    downloads = []
+    lock = threading.Lock()
+
+    def slow_graph_from_point(*args, **kwargs):
+        with lock:
+            downloads.append(args)
+        time.sleep(0.2)
+        return _chain_graph()
+
+    monkeypatch.setattr(routing.ox, 'graph_from_point', slow_graph_from_point)
+    query = ('point', 52.0, 21.0, 1000.0)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        graphs = list(pool.map(routing._get_graph, [query] * 4))
+
+    assert len(downloads) == 1
+    assert all(G is graphs[0] for G in graphs)
+
+
+def test_nearest_intersection_walks_to_chain_end():
+    G = _chain_graph()
+    uadj = routing._undirected_adjacency(G)
+    intersections = {0, 3, 4, 5}
+
+    assert _nearest_intersection(uadj, 3, intersections) == 3
+    assert _nearest_intersection(uadj, 2, intersections) == 3
+    assert _nearest_intersection(uadj, 1, intersections) == 0
+
+
+def test_coords_to_gpx_parses_as_single_track():
+    import gpxpy
+
+    coords = [(52.2297, 21.0122), (52.23, 21.011), (-33.8688123, 151.2092955)]
+
+    gpx = gpxpy.parse(_coords_to_gpx(coords))
+
+    assert len(gpx.tracks) == 1 and len(gpx.tracks[0].segments) == 1
+    points = gpx.tracks[0].segments[0].points
+    assert [(p.latitude, p.longitude) for p in points] == pytest.approx(coords)
+
+
+def test_write_gpx_streams_same_document_in_chunks():
+    import io
+
+    coords = [(52.0 + i * 1e-4, 21.0 - i * 1e-4) for i in range(10)]
+    f = io.StringIO()
+
+    routing.write_gpx(f, coords, chunk_size=3)
+
+    assert f.getvalue() == _coords_to_gpx(coords)
+
+
+def test_node_coords_arrays_with_fallback_keys():
+    G = nx.MultiDiGraph()
+    G.add_node('a', y=52.0, x=21.0)
+    G.add_node('b', lat=52.1, lon=21.1)
+    G.add_node('c')
+
+    node_idx, node_y, node_x = _node_coords(G)
+
+    assert node_idx == {'a': 0, 'b': 1, 'c': 2}
+    assert node_y[:2].tolist() == [52.0, 52.1] and node_x[:2].tolist() == [21.0, 21.1]
+    assert np.isnan(node_y[2]) and np.isnan(node_x[2])
+    assert _node_coords(G) is G.graph['_jadlo_node_coords']
+
+
+def _raw_grid_graph():
+    """Unsimplified 5x5 two-way street grid, 0.01 degrees apart, as OSMnx downloads it."""
+    G = nx.MultiDiGraph(crs='epsg:4326')
+    for i in range(5):
+        for j in range(5):
+            G.add_node(i * 5 + j, y=52.0 + 0.01 * i, x=21.0 + 0.01 * j)
+    osmid = 0
+    for i in range(5):
+        for j in range(5):
+            n = i * 5 + j
+            for m in ([n + 1] if j < 4 else []) + ([n + 5] if i < 4 else []):
+                osmid += 1
+                G.add_edge(n, m, osmid=osmid, length=100.0)
+                G.add_edge(m, n, osmid=osmid, length=100.0)
+    return G
+
+
+def test_parallel_bbox_fetch_matches_single_query(monkeypatch):
+    full = _raw_grid_graph()
+    calls = []
+
+    def fake_graph_from_bbox(n, s, e, w, network_type=None, simplify=True, retain_all=False, truncate_by_edge=False):
+        calls.append((n, s, e, w))
+        inside = {k for k, d in full.nodes(data=True) if s <= d['y'] <= n and w <= d['x'] <= e}
+        # truncate_by_edge keeps edges leaving the bbox together with their outside node
+        keep = inside | {v for u in inside for v in nx.all_neighbors(full, u)}
+        return full.subgraph(keep).copy()
+
+    monkeypatch.setattr(routing.ox, 'graph_from_bbox', fake_graph_from_bbox)
+
+    G = routing._graph_from_bbox_parallel(52.04, 52.0, 21.04, 21.0)
+
+    expected = routing.ox.simplify_graph(_raw_grid_graph())
+    assert len(calls) == 4
+    assert set(G.nodes) == set(expected.nodes)
+    assert sorted(G.edges()) == sorted(expected.edges())
+
+    # quadrants reach past a smaller bbox; the merged graph is truncated back to it
+    G = routing._graph_from_bbox_parallel(52.025, 52.0, 21.025, 21.0)
+    assert G.nodes and all(52.0 <= d['y'] <= 52.025 and 21.0 <= d['x'] <= 21.025 for _, d in G.nodes(data=True))
+
+
+def test_shortest_path_csr_bidirectional_is_exact_on_grid():
+    G = _raw_grid_graph()
+    rng = np.random.default_rng(7)
+    weights = rng.uniform(0.2, 3.0, len(G.edges)) * 1000.0
+    for (_, _, d), wgt in zip(G.edges(data=True), weights):
+        d['weight'] = wgt
+
+    for orig, dest in [(0, 24), (24, 0), (2, 22), (7, 8), (12, 12), (20, 4)]:
+        path = _shortest_path_csr(G, weights, orig, dest)
+        assert path[0] == orig and path[-1] == dest
+        cost = sum(min(d['weight'] for d in G[u][v].values()) for u, v in zip(path, path[1:]))
+        assert cost == pytest.approx(nx.shortest_path_length(G, orig, dest, weight='weight'))
+
+
+def test_nearest_nodes_matches_brute_force():
+    G = _raw_grid_graph()
+    G.add_node('no-coords')
+    points = [(52.0, 21.0), (52.0149, 21.0251), (52.1, 20.9), (51.5, 21.02), (52.031, 21.039)]
+
+    got = routing._nearest_nodes(G, points)
+
+    G.remove_node('no-coords')  # the brute-force reference cannot handle missing coordinates
+    assert got == [_nearest_node_brute_force(G, lon, lat) for lat, lon in points]
+
+
+def test_compute_route_intersections_astar_stays_exact_with_cheap_edges(monkeypatch):
+    # a detour over a cycleway costs less than its length; an unscaled distance heuristic
+    # would overestimate there and let A* settle for the direct residential street
+    monkeypatch.setattr(routing, 'GRAPH_CACHE_DIR', '')
+    G = nx.MultiDiGraph()
+    coords = {0: (52.00, 21.00), 1: (52.00, 21.02), 2: (52.00, 20.996), 7: (52.01, 20.996), 9: (51.99, 21.00), 8: (51.99, 21.02)}
+    for n, (y, x) in coords.items():
+        G.add_node(n, y=y, x=x)
+    # the cycleway leaves westwards and curves back: 0.42 * 2300 m beats the direct 1370 m
+    ways = [(0, 1, 1370.0, 'residential'), (0, 2, 300.0, 'cycleway'), (2, 1, 2000.0, 'cycleway'), (2, 7, 1110.0, 'residential'), (0, 9, 1110.0, 'residential'), (1, 8, 1110.0, 'residential')]
+    for u, v, length, highway in ways:
+        G.add_edge(u, v, length=length, highway=highway)
+        G.add_edge(v, u, length=length, highway=highway)
+    monkeypatch.setattr(routing.ox, 'graph_from_point', lambda *a, **kw: G)
+    params = {'prefer_main_roads': 0.5, 'prefer_unpaved': 0.5, 'heatmap_influence': 1.0}
+
+    coords_out, _ = compute_route_intersections((52.00, 21.00), (52.00, 21.02), params, radius_meters=1000, heading_threshold_deg=180.0)
+
+    assert (52.00, 20.996) in coords_out
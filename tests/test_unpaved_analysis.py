@@ -4,6 +4,7 @@ import time
 from pathlib import Path
 from typing import List, Tuple
 
+import numpy as np
 import pytest
 import gpxpy
 
@@ -142,7 +143,7 @@ def test_count_unpaved_in_artifact():
     print(f'points={len(pts)} looked={looked} unpaved={unpaved_count} frac={frac:.3f} build_time={t1-t0:.2f}s loop_time={t_loop_end-t_loop:.2f}s')
 
 
-def test_generate_100km_strict_avoid_unpaved():
+def test_generate_100km_strict_avoid_unpaved(monkeypatch):
     """Run a segmented generation where unpaved surfaces are heavily penalized.
 
     This will write a new artifact `artifacts/poc_route_100km_intersections_avoid_unpaved.gpx`.
@@ -152,19 +153,17 @@ def test_generate_100km_strict_avoid_unpaved():
     except Exception as e:
         pytest.skip(f"osmnx not available: {e}")
 
-    # monkeypatch _edge_penalty to forbid unpaved surfaces by assigning huge weight
-    orig_penalty = routing._edge_penalty
+    # monkeypatch _edge_weights to forbid unpaved surfaces by assigning huge weight; graphs
+    # and paths cached under the normal weights are cleared around the test (see conftest.py)
+    orig_weights = routing._edge_weights
 
-    def strict_penalty(u, v, key, data, params):
-        surf = data.get('surface')
-        if isinstance(surf, list):
-            surf = surf[0]
-        if surf in SURFACE_UNPAVED:
-            # return very large cost
-            return data.get('length', 1.0) * 1e6
-        return orig_penalty(u, v, key, data, params)
+    def strict_weights(cols, params):
+        weights = orig_weights(cols, params)
+        unpaved = np.isin(np.array(cols.surface_values, dtype=str), list(SURFACE_UNPAVED))[cols.surface_codes]
+        # return very large cost
+        return np.where(unpaved, cols.length * 1e6, weights)
 
-    routing._edge_penalty = strict_penalty
+    monkeypatch.setattr(routing, '_edge_weights', strict_weights)
 
     # run segmented generation (copy of test logic) and write artifact
     start = (52.2297, 21.0122)
@@ -241,8 +240,5 @@ def test_generate_100km_strict_avoid_unpaved():
         segobj.points.append(gpxpy.gpx.GPXTrackPoint(lat, lon))
     out_path.write_text(gpx.to_xml(), encoding='utf-8')
 
-    # restore original penalty
-    routing._edge_penalty = orig_penalty
-
     # quick check: ensure file exists
     assert out_path.exists()